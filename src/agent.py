@@ -1,62 +1,143 @@
-from google.adk.agents import Agent
-from google.adk.tools import FunctionTool
-from src.common import TranslatorEval, EvalRequest
+from src import metrics, tracing
+from src.chunking import merge_evaluations, split_source
+from src.common import TRANSLATION_ERROR_PREFIX, TranslatorEval, EvalRequest, normalize_language
+from src.extraction import extract_code
 from src.tool_provider import ToolProvider
+from src.judge import Judge, GeminiJudge, is_failed_evaluation
+from src.local_judge import LocalJudge
+from src.sandbox import ExecutionResult, execution_pool
+from src.task_store import SqliteTaskStore
+from src.translation_store import TranslationStore
 from src.executor import GreenAgent
+from src.logging_setup import sampled
 from a2a.utils import new_agent_text_message
 from a2a.server.tasks import TaskUpdater
-from a2a.server.tasks import TaskUpdater
+import asyncio
+import hashlib
 import json
-import os
-from google import genai
-from google.genai import types
+import logging
+from collections import Counter
+from uuid import uuid4
 from a2a.types import Part, DataPart
 
-SYSTEM_PROMPT = '''
-you are an expert evaluation agent specialized in evaluating code and programming languages translation and
-how efficient it is to run without errors, and judging a successful translation requires the following
-considerations:
+logger = logging.getLogger(__name__)
+
+# Number of test cases evaluated at once unless overridden by 'max_concurrency' in the request config.
+DEFAULT_MAX_CONCURRENCY = 1
+
+# Pipeline tuning keys accepted in the request config. 'translate_workers' and
+# 'judge_workers' default to 'max_concurrency'; 'queue_size' defaults to the
+# number of judge workers; 'judge_batch_size' (cases scored per judge request)
+# defaults to 1.
+PIPELINE_OPTIONS = ("max_concurrency", "translate_workers", "judge_workers", "queue_size", "judge_batch_size")
+
+# Judge backends selectable with 'judge' in the request config or the server's --judge flag
+JUDGE_BACKENDS = {
+    "gemini": GeminiJudge,
+    "local": LocalJudge,
+}
+
+
+def case_fingerprint(participants: dict[str, list], code_to_translate: str, source_language: str,
+                     target_language: str, judge: str, comparative: bool, execution_inputs: list[str] | None,
+                     chunk_size: int | None = None) -> str:
+    """Identify everything a case's evaluation depends on, so a checkpoint is only reused for the same case.
+
+    ``participants`` maps each role to what identifies the agent behind it:
+    its endpoint and its agent card's name and version.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(
+        [participants, code_to_translate, source_language, target_language, judge, comparative, execution_inputs,
+         chunk_size]
+    ).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def overall_score(evaluation: TranslatorEval) -> float:
+    return (evaluation.execution_correctness + evaluation.style_score
+            + evaluation.conciseness + evaluation.relevance) / 4
+
 
-    - it does not produce error when it runs.
-    - it is styled and commented in the new language method.
-    - it is concise and does not have extra non relevant code.
-    - it is clear and relevant to the topic.
+def case_winner(evaluations: dict[str, TranslatorEval]) -> str:
+    """Winner of one case: the participant named by the most verdicts, ties broken by overall score.
 
-the format of the output translation is as follows, containing at least two points of them with requirement for the first one:
+    A comparative verdict names the same winner in every evaluation; separate
+    verdicts each name their own participant (or 'N/A'), so among several
+    acceptable translations the best scored one wins. An exact tie is 'N/A'.
+    """
+    votes = Counter(e.winner for e in evaluations.values() if e.winner in evaluations)
+    ranks = {role: (count, overall_score(evaluations[role])) for role, count in votes.items()}
+    return _sole_best(ranks)
 
-    1 - the translation: the translation of the code in the new language.
-    2 - it keeps the same functionality of the original code.
-    3 - it have the same structure and logic of the original code.
 
-the translation needs to start with a note about the current language and the new language.
+def _sole_best(ranks: dict) -> str:
+    """The role with the highest rank, or 'N/A' if there is none or several share it."""
+    if not ranks:
+        return "N/A"
+    best = max(ranks.values())
+    leaders = [role for role, rank in ranks.items() if rank == best]
+    return leaders[0] if len(leaders) == 1 else "N/A"
 
-in general the translation needs to be clear, clean and error free.
-'''
 
 class TranslationGreenAgent(GreenAgent):
-    def __init__(self, tool_provider: ToolProvider):
+    def __init__(self, tool_provider: ToolProvider, judge: str = "gemini", task_store: SqliteTaskStore | None = None,
+                 translation_store: TranslationStore | None = None, allow_execution: bool = False):
         self._tool_provider = tool_provider
-        # Initialize Gemini Client
-        self.client = genai.Client(api_key=os.environ.get("GOOGLE_API_KEY"))
+        # 'execute' runs requester-supplied code on this host, so the server must opt in
+        self._allow_execution = allow_execution
+        # Receives a checkpoint of every judged case, enabling 'resume_task_id' and 'previous_task_id'
+        self._task_store = task_store
+        # Keeps every successful translation, replayed instead of the participant with 'rejudge'
+        self._translation_store = translation_store
+        # The default judge is created up front; others on first request
+        self._default_judge = judge
+        self._judges: dict[str, Judge] = {judge: JUDGE_BACKENDS[judge]()}
+        # Shared by all evaluations (and the local judge's syntax checks) so they cannot oversubscribe the host
+        self._execution_pool = execution_pool
 
-    # Removed _create_judge_agent as we use genai.Client directly
+    def _get_judge(self, name: str) -> Judge:
+        if name not in self._judges:
+            self._judges[name] = JUDGE_BACKENDS[name]()
+        return self._judges[name]
 
     def validate_request(self, request: EvalRequest) -> tuple[bool, str]:
         if not request.participants:
             return False, "No participants provided in the evaluation request."
-        if len(request.participants) > 1:
-            return False, "Only one participant is supported per evaluation."
+        if "N/A" in request.participants:
+            return False, "'N/A' cannot be used as a participant role."
         if "code_to_translate" not in request.config and "test_cases" not in request.config:
             return False, "Missing 'code_to_translate' or 'test_cases' in config."
         if "source_language" not in request.config:
             return False, "Missing 'source_language' in config."
         if "target_language" not in request.config:
             return False, "Missing 'target_language' in config."
+        if request.config.get("judge", self._default_judge) not in JUDGE_BACKENDS:
+            return False, f"'judge' must be one of: {', '.join(JUDGE_BACKENDS)}."
+        for option in ("use_judge_cache", "execute", "comparative_judging", "rejudge"):
+            if not isinstance(request.config.get(option, False), bool):
+                return False, f"'{option}' must be a boolean."
+        if request.config.get("execute", False) and not self._allow_execution:
+            return False, "'execute' is disabled on this server (start it with --allow-execution)."
+        chunk_size = request.config.get("chunk_size")
+        if chunk_size is not None and (not isinstance(chunk_size, int) or isinstance(chunk_size, bool) or chunk_size < 1):
+            return False, "'chunk_size' must be a positive integer."
+        for option in ("resume_task_id", "previous_task_id"):
+            if not isinstance(request.config.get(option, ""), str):
+                return False, f"'{option}' must be a string."
+        execution_inputs = request.config.get("execution_inputs", [])
+        if not isinstance(execution_inputs, list) or not all(isinstance(stdin, str) for stdin in execution_inputs):
+            return False, "'execution_inputs' must be a list of strings."
+        for option in PIPELINE_OPTIONS:
+            value = request.config.get(option, DEFAULT_MAX_CONCURRENCY)
+            if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+                return False, f"'{option}' must be a positive integer."
         return True, ""
 
     async def run_eval(self, request: EvalRequest, updater: TaskUpdater) -> None:
-        # Extract the single participant
-        role, endpoint = next(iter(request.participants.items()))
+        # Every case is sent to all participants at once and their translations are judged together
+        participants = request.participants
+        roles = list(participants)
         
         # Determine inputs: support both single 'code_to_translate' and list 'test_cases'
         code_inputs = []
@@ -67,179 +148,319 @@ class TranslationGreenAgent(GreenAgent):
         
         source_language = request.config["source_language"]
         target_language = request.config["target_language"]
-        
-        evaluations = []
-        
-        for i, code_to_translate in enumerate(code_inputs):
-            case_label = f"Case {i+1}/{len(code_inputs)}"
-            await updater.update_status(
-                "working", 
-                new_agent_text_message(f"Processing {case_label} with participant '{role}'...")
-            )
-            
-            # --- TRANSLATION STEP ---
-            try:
-                print(f"[DEBUG] Sending {case_label} to Purple Agent at {endpoint}", flush=True)
-                response = await self._tool_provider.talk_to_agent(
-                    url=endpoint,
-                    message=json.dumps({
-                        "code_to_translate": code_to_translate,
-                        "source_language": source_language,
-                        "target_language": target_language
-                    })
-                )
-                print(f"[DEBUG] Received response for {case_label}: '{response}'", flush=True)
-
-                translated_code = None
-                # Attempt 1: JSON
-                try:
-                    data = json.loads(response)
-                    if isinstance(data, dict):
-                        translated_code = data.get("translated_code") or data.get("code") or data.get("content") or data.get("message")
-                    elif isinstance(data, str):
-                        translated_code = data
-                except json.JSONDecodeError:
-                    pass
-
-                # Attempt 2: Markdown
-                if not translated_code:
-                    import re
-                    matches = re.findall(r"```(?:\w+)?\n(.*?)```", response, re.DOTALL)
-                    if matches:
-                        translated_code = max(matches, key=len).strip()
-                
-                # Attempt 3: Raw
-                if not translated_code:
-                    translated_code = response.strip()
 
-                if not translated_code:
-                     print(f"[WARN] Empty response for {case_label}")
-                     translated_code = "// Error: No Code Translated"
-                
-            except Exception as e:
-                print(f"[ERROR] Communication failed for {case_label}: {e}")
-                translated_code = f"// Error: Communication failed: {e}"
-
-            # --- EVALUATION STEP ---
-            await updater.update_status(
-                "working",
-                new_agent_text_message(f"Evaluating {case_label}...")
-            )
+        # Translation and judging run as two pipeline stages connected by a
+        # bounded queue, so the participants can translate case N+1 while the
+        # judge scores case N. A full queue blocks the translators (backpressure).
+        max_concurrency = request.config.get("max_concurrency", DEFAULT_MAX_CONCURRENCY)
+        translate_workers = request.config.get("translate_workers", max_concurrency)
+        judge_workers = request.config.get("judge_workers", max_concurrency)
+        queue_size = request.config.get("queue_size", judge_workers)
+        use_judge_cache = request.config.get("use_judge_cache", True)
+        judge_batch_size = request.config.get("judge_batch_size", 1)
+        judge_name = request.config.get("judge", self._default_judge)
+        judge = self._get_judge(judge_name)
+        # With several participants, optionally judge their translations side by side in one prompt
+        comparative = request.config.get("comparative_judging", False) and len(roles) > 1
+        # Optional execution stage: run original and translation on 'execution_inputs'
+        execute = request.config.get("execute", False)
+        execution_inputs = request.config.get("execution_inputs", [""])
+        # Judge-only rerun: translations stored by an earlier run are judged again without asking the participants
+        rejudge = request.config.get("rejudge", False)
+        # Cases longer than 'chunk_size' characters are translated and judged in parts
+        chunk_size = request.config.get("chunk_size")
+        # Metric labels; canonical names keep the number of label values bounded
+        language_pair = {
+            "source_language": normalize_language(source_language),
+            "target_language": normalize_language(target_language),
+        }
+        judge_mode = "comparative" if comparative else "batch" if judge_batch_size > 1 else "single"
 
-            prompt = f"""
-{SYSTEM_PROMPT}
-
-Please evaluate the following code translation based on the criteria:
-- Execution Correctness
-- Style & Documentation
-- Conciseness
-- Relevance
-
-Original {source_language} code:
-```
-{code_to_translate}
-```
-
-Translated {target_language} code (from participant '{role}'):
-```
-{translated_code}
-```
-
-Provide your evaluation in the TranslatorEval schema, including reasoning, winner (participant's role or 'N/A'), execution_correctness, style_score, conciseness, and relevance.
-"""
-            # Models that support JSON mode with schema (ordered by preference)
-            json_supported_models = [
-                "gemini-2.5-flash-lite",
-                "gemini-2.0-flash-lite",
-                "gemini-2.0-flash",
-                "gemini-2.5-flash",
-                "gemini-2.0-flash-001",
-                "gemini-2.0-flash-lite-001",
-                "gemini-flash-latest",
-                "gemini-flash-lite-latest",
-                "gemini-pro-latest",
-                "gemini-2.5-pro",
-                "gemini-exp-1206",
-                "gemini-3-flash-preview",
-                "gemini-3-pro-preview"
+        # Per case: the evaluation of each participant, by role
+        results: dict[int, dict[str, TranslatorEval]] = {}
+        # Open trace span of every case, from its translation until it is finished
+        case_spans = {}
+
+        try:
+            # --- RESUME STEP ---
+            # Cases checkpointed by an interrupted run ('resume_task_id') or an earlier run
+            # ('previous_task_id') are not redone if nothing they depend on changed, the
+            # participants' agent card versions included, and they did not fail
+            identities = await asyncio.gather(
+                *(self._participant_identity(endpoint) for endpoint in participants.values())
+            )
+            # Agent card name and version of every role, which the translation store is keyed by
+            agent_cards = {role: identity[1:] for role, identity in zip(roles, identities)}
+            fingerprints = [
+                case_fingerprint(dict(zip(roles, identities)), code_to_translate, source_language, target_language,
+                                 judge_name, comparative, execution_inputs if execute else None, chunk_size)
+                for code_to_translate in code_inputs
             ]
-            
-            # Text-only models (Gemma and experimental) - use text mode and parse manually
-            text_only_models = [
-                "gemma-3-1b-it",
-                "gemma-3-4b-it",
-                "gemma-3-12b-it",
-                "gemma-3-27b-it",
-                "gemma-3n-e2b-it",
-                "gemma-3n-e4b-it"
+            resumed: dict[int, dict[str, TranslatorEval]] = {}
+            reused_task_ids = [
+                task_id for task_id in (request.config.get("previous_task_id"), request.config.get("resume_task_id"))
+                if task_id
             ]
-            
-            models_to_try = json_supported_models + text_only_models
-            
-            case_eval = None
-            for model in models_to_try:
-                try:
-                    use_json_mode = model in json_supported_models
-                    
-                    if use_json_mode:
-                        response = await self.client.aio.models.generate_content(
-                            model=model,
-                            contents=prompt,
-                            config=types.GenerateContentConfig(
-                                response_mime_type='application/json',
-                                response_schema=TranslatorEval
+            if self._task_store is not None:
+                for task_id in reused_task_ids:
+                    checkpoints = await self._task_store.load_checkpoints(task_id)
+                    resumed.update({
+                        i: case_evals for i, (fingerprint, case_evals, failed) in checkpoints.items()
+                        if i < len(code_inputs) and fingerprint == fingerprints[i] and not failed
+                    })
+                if reused_task_ids:
+                    logger.info("Reusing %d/%d cases from task %s", len(resumed), len(code_inputs),
+                                ", ".join(reused_task_ids))
+
+            pending = asyncio.Queue()
+            for i, code_to_translate in enumerate(code_inputs):
+                if i not in resumed:
+                    pending.put_nowait((i, code_to_translate))
+            translated = asyncio.Queue(maxsize=queue_size)
+            executions: dict[tuple[int, str], asyncio.Task] = {}
+            # Per chunked case: every part's source and its translation by each role
+            case_chunks: dict[int, list[tuple[str, dict[str, str]]]] = {}
+
+            # Each finished case is streamed as one chunk of the "Case Results" artifact,
+            # so clients see results as they arrive and keep them if the connection drops
+            case_artifact_id = uuid4().hex
+            streamed = 0
+            stream_lock = asyncio.Lock()
+
+            async def publish_case(i: int, case_evals: dict[str, TranslatorEval]) -> None:
+                nonlocal streamed
+                async with stream_lock:
+                    streamed += 1
+                    await updater.add_artifact(
+                        parts=[
+                            Part(root=DataPart(data={"case": i + 1, "participant": role, **case_eval.model_dump()}))
+                            for role, case_eval in case_evals.items()
+                        ],
+                        artifact_id=case_artifact_id,
+                        name="Case Results",
+                        append=streamed > 1,
+                        last_chunk=streamed == len(code_inputs)
+                    )
+
+            async def finish_case(i: int, case_evals: dict[str, TranslatorEval], failed: bool = False) -> None:
+                # Every participant's evaluation records the case winner, so aggregates agree on it
+                winner = case_winner(case_evals)
+                case_evals = {
+                    role: case_eval.model_copy(update={"winner": winner}) for role, case_eval in case_evals.items()
+                }
+                results[i] = case_evals
+                if (case_span := case_spans.pop(i, None)) is not None:
+                    case_span.set_attribute("winner", winner)
+                    case_span.end()
+                if self._task_store is not None:
+                    await self._task_store.save_checkpoint(updater.task_id, i, fingerprints[i], case_evals, failed)
+                await publish_case(i, case_evals)
+
+            async def translate_worker() -> None:
+                while not pending.empty():
+                    i, code_to_translate = pending.get_nowait()
+                    case_label = f"Case {i+1}/{len(code_inputs)}"
+                    await updater.update_status(
+                        "working", 
+                        new_agent_text_message(
+                            f"Processing {case_label} with participant{'s' if len(roles) > 1 else ''} "
+                            f"{', '.join(repr(role) for role in roles)}..."
+                        )
+                    )
+                    case_span = case_spans[i] = tracing.start_span("evaluation.case", case=i + 1, **language_pair)
+                    # A case longer than 'chunk_size' is split into top-level units (functions, classes...)
+                    chunks = split_source(code_to_translate, source_language, chunk_size) if chunk_size else [code_to_translate]
+                    if len(chunks) > 1:
+                        logger.debug("Split %s into %d parts", case_label, len(chunks))
+                        case_span.set_attribute("parts", len(chunks))
+                    # The participants' calls (and executions) are children of the case's span
+                    with tracing.use_span(case_span), metrics.cases_in_flight.track(stage="translate"):
+                        # Every part goes to every participant at once
+                        parts = [(j, role) for j in range(len(chunks)) for role in roles]
+                        # Messages that may be in flight together each start a conversation of their own,
+                        # so a participant never sees another case's messages in its history
+                        new_conversation = translate_workers > 1 or len(chunks) > 1
+                        translated_parts = await asyncio.gather(*(
+                            self._translate_case(
+                                (case_label if len(chunks) == 1 else f"{case_label} part {j+1}/{len(chunks)}")
+                                + ("" if len(roles) == 1 else f" ({role})"),
+                                role, participants[role], chunks[j], source_language, target_language,
+                                agent_cards[role], rejudge, new_conversation
                             )
+                            for j, role in parts
+                        ))
+                        by_part = [{} for _ in chunks]
+                        for (j, role), translated_code in zip(parts, translated_parts):
+                            by_part[j][role] = translated_code
+                        if len(chunks) > 1:
+                            case_chunks[i] = list(zip(chunks, by_part))
+                        # The whole translated file, for execution
+                        translations = {role: "\n\n".join(part[role] for part in by_part) for role in roles}
+                        if execute:
+                            # Executes in the execution pool while the case is being judged
+                            for role, translated_code in translations.items():
+                                executions[i, role] = stages.create_task(self._execution_pool.compare(
+                                    code_to_translate, source_language, translated_code, target_language, execution_inputs
+                                ))
+                    await translated.put((i, code_to_translate, translations))
+
+            async def judge_cases(batch: list[tuple[int, str, dict[str, str]]]) -> dict[int, dict[str, TranslatorEval]]:
+                if not batch:
+                    return {}
+                if comparative:
+                    # One side-by-side verdict per case
+                    comparisons = await asyncio.gather(*(
+                        judge.judge_comparison(
+                            f"Case {i+1}/{len(code_inputs)}", code_to_translate, translations,
+                            source_language, target_language, use_cache=use_judge_cache
                         )
-                        case_eval = response.parsed
-                    else:
-                        # For Gemma models - use text mode and parse manually
-                        response = await self.client.aio.models.generate_content(
-                            model=model,
-                            contents=prompt
+                        for i, code_to_translate, translations in batch
+                    ))
+                    return {i: case_evals for (i, _, _), case_evals in zip(batch, comparisons)}
+                # Each participant's translations of the batch are judged together
+                verdicts = await asyncio.gather(*(
+                    judge.judge_batch(
+                        [(i, code_to_translate, translations[role]) for i, code_to_translate, translations in batch],
+                        len(code_inputs), role, source_language, target_language, use_cache=use_judge_cache
+                    )
+                    for role in roles
+                ))
+                return {i: {role: by_case[i] for role, by_case in zip(roles, verdicts)} for i, _, _ in batch}
+
+            async def judge_worker() -> None:
+                done = False
+                while not done:
+                    if (item := await translated.get()) is None:
+                        return
+                    # Collect up to 'judge_batch_size' translated cases for one judge request,
+                    # stopping early at this worker's sentinel
+                    batch = [item]
+                    while len(batch) < judge_batch_size:
+                        if (item := await translated.get()) is None:
+                            done = True
+                            break
+                        batch.append(item)
+                    for i, _, _ in batch:
+                        await updater.update_status(
+                            "working",
+                            new_agent_text_message(f"Evaluating Case {i+1}/{len(code_inputs)}...")
                         )
-                        response_text = response.text
-                        
-                        # Try to parse JSON from response
-                        import re
-                        json_match = re.search(r'\{[^{}]*\}', response_text, re.DOTALL)
-                        if json_match:
-                            data = json.loads(json_match.group(0))
-                            case_eval = TranslatorEval(
-                                reasoning=data.get("reasoning", "Evaluated by Gemma model"),
-                                winner=data.get("winner", role),
-                                execution_correctness=float(data.get("execution_correctness", 5)),
-                                style_score=float(data.get("style_score", 5)),
-                                conciseness=float(data.get("conciseness", 5)),
-                                relevance=float(data.get("relevance", 5))
+                    metrics.cases_in_flight.inc(len(batch), stage="judge")
+                    # A single case is judged under its own span; a batch links to the spans of its cases
+                    batch_spans = [case_spans[i] for i, _, _ in batch if i in case_spans]
+                    try:
+                        with tracing.span("judge", parent=batch_spans[0] if len(batch_spans) == 1 else None,
+                                          links=batch_spans if len(batch_spans) > 1 else (),
+                                          judge=judge_name, mode=judge_mode, cases=len(batch)), \
+                                metrics.judge_seconds.time(judge=judge_name, mode=judge_mode, **language_pair):
+                            # Chunked cases are judged part by part, alongside the rest of the batch
+                            chunked = [i for i, _, _ in batch if i in case_chunks]
+                            evaluations, chunk_verdicts = await asyncio.gather(
+                                judge_cases([item for item in batch if item[0] not in case_chunks]),
+                                asyncio.gather(*(
+                                    self._judge_chunks(
+                                        judge, f"Case {i+1}/{len(code_inputs)}", case_chunks[i], comparative,
+                                        source_language, target_language, use_cache=use_judge_cache
+                                    )
+                                    for i in chunked
+                                ))
                             )
-                    
-                    if case_eval:
-                        break
-                except Exception as e:
-                    print(f"[DEBUG] Model {model} failed for {case_label}: {e}")
-                    if "429" in str(e):
-                        import asyncio
-                        await asyncio.sleep(5)
-            
-            if not case_eval:
-                # Fallback if evaluation fails
-                case_eval = TranslatorEval(
-                    reasoning=f"Evaluation failed for {case_label}",
-                    winner="N/A",
-                    execution_correctness=0,
-                    style_score=0,
-                    conciseness=0,
-                    relevance=0
+                            # Cases the judge failed on in some part
+                            failed_parts = set()
+                            for i, (case_evals, part_failed) in zip(chunked, chunk_verdicts):
+                                evaluations[i] = case_evals
+                                if part_failed:
+                                    failed_parts.add(i)
+                    finally:
+                        metrics.cases_in_flight.dec(len(batch), stage="judge")
+                    for i, _, translations in batch:
+                        case_evals = evaluations[i]
+                        # Failed cases are checkpointed too, but a later run redoes them
+                        translated_parts = [code for _, by_role in case_chunks.pop(i, ()) for code in by_role.values()]
+                        failed = (any(code.startswith(TRANSLATION_ERROR_PREFIX)
+                                      for code in translated_parts or translations.values())
+                                  or any(is_failed_evaluation(case_eval) for case_eval in case_evals.values())
+                                  or i in failed_parts)
+                        for role in case_evals:
+                            if (i, role) in executions:
+                                case_evals[role] = self._apply_execution(case_evals[role], await executions[i, role])
+                            metrics.cases_total.inc(participant=role, **language_pair)
+                        await finish_case(i, case_evals, failed)
+
+            if resumed:
+                await updater.update_status(
+                    "working",
+                    new_agent_text_message(
+                        f"Reused {len(resumed)}/{len(code_inputs)} cases from task {', '.join(reused_task_ids)}."
+                    )
                 )
-            
-            evaluations.append(case_eval)
+                for i, case_evals in sorted(resumed.items()):
+                    # Checkpointed again under this task, so it can be resumed in turn
+                    await finish_case(i, case_evals)
+
+            async with asyncio.TaskGroup() as stages:
+                for _ in range(judge_workers):
+                    stages.create_task(judge_worker())
+                async with asyncio.TaskGroup() as translators:
+                    for _ in range(translate_workers):
+                        translators.create_task(translate_worker())
+                # One sentinel per judge worker once every case has been translated
+                for _ in range(judge_workers):
+                    await translated.put(None)
+        except asyncio.CancelledError:
+            # Canceled through GreenExecutor.cancel: in-flight translation and judge
+            # calls are abandoned, and the cases finished so far are still reported
+            logger.info("Evaluation canceled after %d/%d cases", len(results), len(code_inputs))
+            for case_span in case_spans.values():
+                case_span.set_attribute("canceled", True)
+            message = f"Evaluation canceled after {len(results)}/{len(code_inputs)} test cases."
+            if results:
+                summary = await self._report_results(updater, results, roles, len(code_inputs))
+                message += f" Partial result: {summary}"
+            await updater.cancel(new_agent_text_message(message))
+            raise
+        finally:
+            # Cases left unfinished by a cancellation or failure
+            for case_span in case_spans.values():
+                case_span.end()
 
         # --- AGGREGATION STEP ---
-        count = len(evaluations)
-        if count == 0:
+        if not results:
              await updater.failed(new_agent_text_message("No evaluations occurred."))
              return
 
+        summary = await self._report_results(updater, results, roles, len(code_inputs))
+        
+        await updater.update_status(
+            "completed",
+            new_agent_text_message(f"Evaluation complete. {summary}")
+        )
+
+    async def _report_results(self, updater: TaskUpdater, results: dict[int, dict[str, TranslatorEval]],
+                              roles: list[str], total: int) -> str:
+        """Emit the "Evaluation Result" artifact (one part per participant) and return a one-line summary."""
+        # Results are indexed by case, so the aggregate is identical to a sequential run
+        aggregates = {role: self._aggregate([results[i][role] for i in sorted(results)], total) for role in roles}
+        await updater.add_artifact(
+           parts=[
+               Part(root=DataPart(data={"participant": role, **aggregate.model_dump()}))
+               for role, aggregate in aggregates.items()
+           ],
+           name="Evaluation Result"
+        )
+        scores = [
+            f"Execution: {a.execution_correctness}, Style: {a.style_score}, Conciseness: {a.conciseness}, Relevance: {a.relevance}"
+            for a in aggregates.values()
+        ]
+        winner = next(iter(aggregates.values())).winner
+        if len(roles) == 1:
+            return f"Winner: {winner}, {scores[0]}"
+        return f"Winner: {winner}. " + "; ".join(f"{role} - {score}" for role, score in zip(roles, scores))
+
+    @staticmethod
+    def _aggregate(evaluations: list[TranslatorEval], total: int) -> TranslatorEval:
+        """Average the per-case evaluations; ``total`` < len means the run stopped early."""
+        count = len(evaluations)
         avg_exec = sum(e.execution_correctness for e in evaluations) / count
         avg_style = sum(e.style_score for e in evaluations) / count
         avg_conciseness = sum(e.conciseness for e in evaluations) / count
@@ -247,13 +468,15 @@ Provide your evaluation in the TranslatorEval schema, including reasoning, winne
         
         combined_reasoning = "\n\n".join([f"[{i+1}/{count}] Winner: {e.winner}. {e.reasoning}" for i, e in enumerate(evaluations)])
         
-        # Determine overall winner (majority wins or high score?)
-        # For simplicity, if we have a winner in >50% cases, we propagate that, else N/A
-        winners = [e.winner for e in evaluations if e.winner != "N/A"]
-        overall_winner = max(set(winners), key=winners.count) if winners else "N/A"
+        # The participant that won the most cases; 'N/A' when several won as many
+        overall_winner = _sole_best(Counter(e.winner for e in evaluations if e.winner != "N/A"))
 
-        final_result = TranslatorEval(
-            reasoning=f"Aggregated Score across {count} test cases.\n\nDetails:\n{combined_reasoning}",
+        if count < total:
+            summary = f"Partial aggregate across {count} of {total} test cases (evaluation canceled)."
+        else:
+            summary = f"Aggregated Score across {count} test cases."
+        return TranslatorEval(
+            reasoning=f"{summary}\n\nDetails:\n{combined_reasoning}",
             winner=overall_winner,
             execution_correctness=round(avg_exec, 2),
             style_score=round(avg_style, 2),
@@ -261,12 +484,118 @@ Provide your evaluation in the TranslatorEval schema, including reasoning, winne
             relevance=round(avg_relevance, 2)
         )
 
-        await updater.add_artifact(
-           parts=[Part(root=DataPart(data=final_result.model_dump()))],
-           name="Evaluation Result"
-        )
-        
-        await updater.update_status(
-            "completed",
-            new_agent_text_message(f"Evaluation complete. Winner: {final_result.winner}, Execution: {final_result.execution_correctness}, Style: {final_result.style_score}, Conciseness: {final_result.conciseness}, Relevance: {final_result.relevance}")
-        )
\ No newline at end of file
+    async def _participant_identity(self, endpoint: str) -> list:
+        """Endpoint, agent card name and version of a participant, part of every case fingerprint."""
+        try:
+            card = await self._tool_provider.get_agent_card(endpoint)
+        except Exception as e:
+            # The translations will fail too, and failed cases are never reused
+            logger.warning("Could not resolve the agent card of %s: %s", endpoint, e)
+            return [endpoint, None, None]
+        return [endpoint, card.name, card.version]
+
+    async def _translate_case(self, case_label: str, role: str, endpoint: str, code_to_translate: str,
+                              source_language: str, target_language: str, agent_card: list | None = None,
+                              rejudge: bool = False, new_conversation: bool = False) -> str:
+        # Translations are only stored for a participant whose agent card (name and version) is known
+        store = self._translation_store if agent_card and all(agent_card) else None
+        agent_name, agent_version = agent_card if store is not None else (None, None)
+
+        # --- REPLAY STEP ---
+        if rejudge and store is not None:
+            stored = await store.get(
+                agent_name, agent_version, source_language, target_language, code_to_translate
+            )
+            if stored is not None:
+                logger.debug("Replaying the stored translation of %s by %s %s", case_label, agent_name, agent_version)
+                metrics.translations_replayed_total.inc(participant=role)
+                return stored
+            logger.info("No stored translation of %s by %s %s, asking the participant",
+                        case_label, agent_name, agent_version)
+
+        # --- TRANSLATION STEP ---
+        try:
+            logger.debug("Sending %s to Purple Agent at %s", case_label, endpoint)
+            with metrics.translation_seconds.time(participant=role,
+                                                  source_language=normalize_language(source_language),
+                                                  target_language=normalize_language(target_language)):
+                # Sent as a DataPart when the participant's card accepts JSON input
+                outputs = await self._tool_provider.send_to_agent(
+                    url=endpoint,
+                    new_conversation=new_conversation,
+                    message={
+                        "code_to_translate": code_to_translate,
+                        "source_language": source_language,
+                        "target_language": target_language
+                    }
+                )
+            response = outputs["response"]
+            logger.debug("Received response for %s: %r", case_label, response, extra=sampled())
+
+            status = outputs.get("status")
+            if status not in (None, "completed"):
+                # A failed (or unfinished) task carries no translation, so the case counts as
+                # failed: it is not stored, and later runs ask the participant again
+                logger.warning("Participant task for %s ended %s", case_label, status)
+                metrics.translation_errors_total.inc(participant=role)
+                translated_code = f"{TRANSLATION_ERROR_PREFIX} Participant task {status}: {response}"
+            else:
+                # DataPart payloads, then JSON, Markdown, embedded JSON and finally the raw text
+                translated_code = extract_code(response, outputs.get("data"), target_language)
+                if not translated_code:
+                    logger.warning("Empty response for %s", case_label)
+                    translated_code = f"{TRANSLATION_ERROR_PREFIX} No Code Translated"
+            
+        except Exception as e:
+            logger.error("Communication failed for %s: %s", case_label, e)
+            metrics.translation_errors_total.inc(participant=role)
+            translated_code = f"{TRANSLATION_ERROR_PREFIX} Communication failed: {e}"
+
+        if store is not None and not translated_code.startswith(TRANSLATION_ERROR_PREFIX):
+            await store.put(
+                agent_name, agent_version, source_language, target_language, code_to_translate, translated_code
+            )
+        return translated_code
+
+    @staticmethod
+    async def _judge_chunks(judge: Judge, case_label: str, chunks: list[tuple[str, dict[str, str]]],
+                            comparative: bool, source_language: str, target_language: str,
+                            use_cache: bool = True) -> tuple[dict[str, TranslatorEval], bool]:
+        """Judge a chunked case part by part and merge each participant's verdicts, weighted by part size.
+
+        Also returns whether the judge failed on any part.
+        """
+        labels = [f"{case_label} part {j+1}/{len(chunks)}" for j in range(len(chunks))]
+        if comparative:
+            verdicts = await asyncio.gather(*(
+                judge.judge_comparison(label, source, translations, source_language, target_language,
+                                       use_cache=use_cache)
+                for label, (source, translations) in zip(labels, chunks)
+            ))
+        else:
+            parts = [(j, role) for j, (_, translations) in enumerate(chunks) for role in translations]
+            part_evals = await asyncio.gather(*(
+                judge.judge_case(labels[j], role, chunks[j][0], chunks[j][1][role], source_language,
+                                 target_language, use_cache=use_cache)
+                for j, role in parts
+            ))
+            verdicts = [{} for _ in chunks]
+            for (j, role), part_eval in zip(parts, part_evals):
+                verdicts[j][role] = part_eval
+        weights = [len(source) for source, _ in chunks]
+        evaluations = {role: merge_evaluations([verdict[role] for verdict in verdicts], weights)
+                       for role in verdicts[0]}
+        failed = any(is_failed_evaluation(part_eval) for verdict in verdicts for part_eval in verdict.values())
+        return evaluations, failed
+
+    @staticmethod
+    def _apply_execution(case_eval: TranslatorEval, execution: ExecutionResult) -> TranslatorEval:
+        """Replace the judge's execution_correctness estimate with the measured result."""
+        if execution.score is None:
+            return case_eval.model_copy(update={
+                "reasoning": f"{case_eval.reasoning}\n\nExecution not measured: {execution.details}."
+            })
+        return case_eval.model_copy(update={
+            "execution_correctness": execution.score,
+            "reasoning": f"{case_eval.reasoning}\n\nMeasured execution: {execution.details}."
+        })
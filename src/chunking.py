@@ -0,0 +1,146 @@
+import ast
+import re
+
+from src.common import TranslatorEval, normalize_language
+
+# Languages whose top-level units are delimited by braces
+BRACE_LANGUAGES = {
+    "c", "cpp", "csharp", "java", "javascript", "typescript", "go", "rust", "kotlin", "swift", "php", "scala",
+}
+
+# A line with its terminator; only \n, \r\n and \r end lines, as for the Python parser
+_LINE_PATTERN = re.compile(r"[^\r\n]*(?:\r\n|\r|\n)|[^\r\n]+\Z")
+
+
+def _lines(code: str) -> list[str]:
+    return _LINE_PATTERN.findall(code)
+
+
+def _python_unit_starts(code: str) -> list[int] | None:
+    """Line numbers (0-based) where a top-level statement, decorators included, begins."""
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        # Invalid, or nested too deeply for this interpreter's parser: split at paragraphs instead
+        return None
+    starts = []
+    for node in tree.body:
+        decorators = getattr(node, "decorator_list", [])
+        starts.append(min([node.lineno] + [d.lineno for d in decorators]) - 1)
+    return starts
+
+
+def _brace_unit_starts(code: str, quotes: str = "\"'`") -> list[int]:
+    """Line numbers (0-based) that begin at brace depth 0, outside strings and comments.
+
+    A line starting with ``{`` is not a start, so an Allman-style body stays
+    with its declaration.
+    """
+    starts = []
+    depth = 0
+    quote = None
+    block_comment = False
+    for number, line in enumerate(_lines(code)):
+        if depth == 0 and quote is None and not block_comment and not line.lstrip().startswith("{"):
+            starts.append(number)
+        position = 0
+        while position < len(line):
+            char = line[position]
+            if block_comment:
+                if line.startswith("*/", position):
+                    block_comment = False
+                    position += 1
+            elif quote is not None:
+                if char == "\\":
+                    position += 1
+                elif char == quote:
+                    quote = None
+            elif line.startswith("//", position):
+                break
+            elif line.startswith("/*", position):
+                block_comment = True
+                position += 1
+            elif char in quotes:
+                quote = char
+            elif char == "{":
+                depth += 1
+            elif char == "}":
+                depth = max(depth - 1, 0)
+            position += 1
+        # Only template literals span lines; an unterminated quote is a character literal gone wrong
+        if quote in ("'", '"'):
+            quote = None
+    return starts
+
+
+def _paragraph_starts(code: str) -> list[int]:
+    """Line numbers (0-based) of unindented lines that follow a blank line."""
+    lines = _lines(code)
+    return [0] + [
+        number for number in range(1, len(lines))
+        if not lines[number - 1].strip() and lines[number][:1] not in (" ", "\t", "\r", "\n")
+    ]
+
+
+def split_source(code: str, language: str, max_chars: int) -> list[str]:
+    """Split ``code`` into chunks of whole top-level units of at most ``max_chars`` characters.
+
+    Python is split at top-level statements (functions, classes, imports...),
+    brace languages at declarations closed at depth 0 and other languages at
+    unindented paragraphs. Consecutive units are packed into one chunk while
+    they fit; a unit longer than ``max_chars`` becomes a chunk on its own.
+    Joining the chunks gives back ``code``.
+    """
+    if len(code) <= max_chars:
+        return [code]
+    language = normalize_language(language)
+    starts = None
+    if language == "python":
+        starts = _python_unit_starts(code)
+    elif language in BRACE_LANGUAGES:
+        # Rust lifetimes ('a) are not quotes
+        starts = _brace_unit_starts(code, '"' if language == "rust" else "\"'`")
+    if starts is None:
+        starts = _paragraph_starts(code)
+
+    lines = _lines(code)
+    boundaries = sorted({0, *starts, len(lines)})
+    units = ["".join(lines[start:end]) for start, end in zip(boundaries, boundaries[1:])]
+
+    chunks = []
+    current = ""
+    for unit in units:
+        if current and len(current) + len(unit) > max_chars:
+            chunks.append(current)
+            current = ""
+        current += unit
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def merge_evaluations(evaluations: list[TranslatorEval], weights: list[int]) -> TranslatorEval:
+    """One evaluation of a whole file from those of its chunks, with scores weighted by chunk size.
+
+    The winner is the one named by the chunks covering most of the file.
+    """
+    total = sum(weights) or 1
+
+    def weighted(field: str) -> float:
+        return round(sum(getattr(e, field) * w for e, w in zip(evaluations, weights)) / total, 2)
+
+    shares: dict[str, int] = {}
+    for evaluation, weight in zip(evaluations, weights):
+        shares[evaluation.winner] = shares.get(evaluation.winner, 0) + weight
+    details = "\n\n".join(
+        f"[part {j+1}/{len(evaluations)}, {weight} chars] Winner: {e.winner}. {e.reasoning}"
+        for j, (e, weight) in enumerate(zip(evaluations, weights))
+    )
+    return TranslatorEval(
+        reasoning=f"Size-weighted score across {len(evaluations)} parts.\n\nDetails:\n{details}",
+        winner=max(shares, key=shares.get),
+        execution_correctness=weighted("execution_correctness"),
+        style_score=weighted("style_score"),
+        conciseness=weighted("conciseness"),
+        relevance=weighted("relevance"),
+    )
@@ -1,29 +1,56 @@
+import asyncio
+import json
+import logging
+import time
+from collections.abc import Awaitable, Callable
 import httpx
 from uuid import uuid4
 from a2a.client import (
     A2ACardResolver,
+    Client,
     ClientConfig,
     ClientFactory,
     Consumer,
 )
+from a2a.client.errors import A2AClientError
 from a2a.types import (
+    AgentCard,
     Message,
     Part,
     Role,
     TextPart,
     DataPart,
     Task,
+    TaskArtifactUpdateEvent,
 )
 
+from src import metrics, tracing
+from src.logging_setup import sampled
+
+logger = logging.getLogger(__name__)
+
 DEFAULT_TIMEOUT = 300
+# Seconds an agent card is reused before it is resolved again
+CARD_CACHE_TTL = 300
+# Connection pool limits for each base URL
+DEFAULT_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+# Agent card input/output modes of DataPart payloads and of plain text
+DATA_MODE = "application/json"
+TEXT_MODE = "text/plain"
+# Answer formats this client reads, announced with every message
+ACCEPTED_OUTPUT_MODES = [DATA_MODE, TEXT_MODE]
 
-def create_message(*, role: Role = Role.user, text: str, context_id: str | None = None) -> Message:
+def create_message(*, role: Role = Role.user, text: str | None = None, data: dict | None = None,
+                   context_id: str | None = None, metadata: dict | None = None) -> Message:
+    """Message with a single DataPart when ``data`` is given, a TextPart otherwise."""
+    part = DataPart(kind="data", data=data) if data is not None else TextPart(kind="text", text=text or "")
     return Message(
         kind="message",
         role=role,
-        parts=[Part(TextPart(kind="text", text=text))],
+        parts=[Part(part)],
         message_id=uuid4().hex,
-        context_id=context_id
+        context_id=context_id,
+        metadata=metadata or None
     )
 
 def merge_parts(parts: list[Part]) -> str:
@@ -32,82 +59,222 @@ def merge_parts(parts: list[Part]) -> str:
         if isinstance(part.root, TextPart):
             chunks.append(part.root.text)
         elif isinstance(part.root, DataPart):
-            chunks.append(str(part.root.data))
+            chunks.append(json.dumps(part.root.data))
     return "\n".join(chunks)
 
-async def send_message(message: str, base_url: str, context_id: str | None = None, streaming=False, consumer: Consumer | None = None):
-    """Returns dict with context_id, response and status (if exists)"""
-    async with httpx.AsyncClient(timeout=DEFAULT_TIMEOUT) as httpx_client:
-        resolver = A2ACardResolver(httpx_client=httpx_client, base_url=base_url)
-        agent_card = await resolver.get_agent_card()
-        config = ClientConfig(
-            httpx_client=httpx_client,
+def accepts_data(agent_card: AgentCard) -> bool:
+    """Whether an agent declares DataPart input, by default or for one of its skills."""
+    modes = set(agent_card.default_input_modes or [])
+    for skill in agent_card.skills or []:
+        modes.update(skill.input_modes or [])
+    return DATA_MODE in modes
+
+def data_payloads(parts: list[Part]) -> list[dict]:
+    """The structured payloads of a message, without a round trip through text."""
+    return [part.root.data for part in parts if isinstance(part.root, DataPart)]
+
+class ClientPool:
+    """Registry of long-lived A2A clients keyed by base URL.
+
+    Each base URL gets one connection-pooled ``httpx.AsyncClient`` and a cached
+    agent card that is resolved again after ``card_ttl`` seconds. Call
+    ``aclose()`` (e.g. on server shutdown) to release the connections.
+    """
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT, card_ttl: float = CARD_CACHE_TTL,
+                 limits: httpx.Limits = DEFAULT_LIMITS):
+        self._timeout = timeout
+        self._card_ttl = card_ttl
+        self._limits = limits
+        self._httpx_clients: dict[str, httpx.AsyncClient] = {}
+        self._cards: dict[str, tuple[float, AgentCard]] = {}
+        self._clients: dict[tuple[str, bool], Client] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def __aenter__(self) -> "ClientPool":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    def _httpx_client(self, base_url: str) -> httpx.AsyncClient:
+        httpx_client = self._httpx_clients.get(base_url)
+        if httpx_client is None:
+            httpx_client = httpx.AsyncClient(timeout=self._timeout, limits=self._limits)
+            self._httpx_clients[base_url] = httpx_client
+        return httpx_client
+
+    async def get_agent_card(self, base_url: str) -> AgentCard:
+        cached = self._cards.get(base_url)
+        if cached and time.monotonic() - cached[0] < self._card_ttl:
+            return cached[1]
+        # One resolution per URL even when many cases start at once
+        async with self._locks.setdefault(base_url, asyncio.Lock()):
+            cached = self._cards.get(base_url)
+            if cached and time.monotonic() - cached[0] < self._card_ttl:
+                return cached[1]
+            resolver = A2ACardResolver(httpx_client=self._httpx_client(base_url), base_url=base_url)
+            with metrics.card_resolution_seconds.time(agent=base_url):
+                agent_card = await resolver.get_agent_card()
+            self._cards[base_url] = (time.monotonic(), agent_card)
+            # Clients built from a stale card must be recreated
+            for key in [key for key in self._clients if key[0] == base_url]:
+                del self._clients[key]
+            return agent_card
+
+    async def get_client(self, base_url: str, streaming: bool = False, consumer: Consumer | None = None) -> Client:
+        agent_card = await self.get_agent_card(base_url)
+        factory = ClientFactory(ClientConfig(
+            httpx_client=self._httpx_client(base_url),
             streaming=streaming,
-        )
-        factory = ClientFactory(config)
-        client = factory.create(agent_card)
+            accepted_output_modes=ACCEPTED_OUTPUT_MODES,
+        ))
         if consumer:
-            await client.add_event_consumer(consumer)
+            # Consumers are attached per client, so don't share this one
+            return factory.create(agent_card, consumers=[consumer])
+        client = self._clients.get((base_url, streaming))
+        if client is None:
+            client = factory.create(agent_card)
+            self._clients[(base_url, streaming)] = client
+        return client
 
-        outbound_msg = create_message(text=message, context_id=context_id)
+    def invalidate(self, base_url: str) -> None:
+        """Forget the cached card and clients for ``base_url``, keeping its connections."""
+        self._cards.pop(base_url, None)
+        for key in [key for key in self._clients if key[0] == base_url]:
+            del self._clients[key]
+
+    async def aclose(self) -> None:
+        httpx_clients = list(self._httpx_clients.values())
+        self._httpx_clients.clear()
+        self._cards.clear()
+        self._clients.clear()
+        for httpx_client in httpx_clients:
+            await httpx_client.aclose()
+
+
+async def send_message(message: str | dict, base_url: str, context_id: str | None = None, streaming=False, consumer: Consumer | None = None,
+                       pool: ClientPool | None = None,
+                       on_artifact: Callable[[TaskArtifactUpdateEvent], Awaitable[None]] | None = None):
+    """Returns dict with context_id, response, data, artifacts and status
+
+    ``status`` is the final state of the agent's task (e.g. ``"completed"`` or
+    ``"failed"``), ``"completed"`` for a direct Message answer, or None when
+    the agent sent neither.
+
+    A ``dict`` message is sent as a DataPart to agents whose card declares
+    ``application/json`` input, and as JSON text to the others.
+
+    Pass a long-lived ``pool`` to reuse connections and agent cards across
+    calls; without one a temporary pool is opened and closed for this message.
+    In streaming mode ``on_artifact`` is awaited for every artifact chunk as it
+    arrives (e.g. per-case results); ``artifacts`` maps each artifact's name to
+    all of its parts once the task ends. ``data`` holds the payloads of the
+    answer's DataParts (also merged into ``response`` as JSON). The current trace context is sent
+    in the message metadata (``traceparent``) so the agent can join the trace.
+    """
+    if pool is None:
+        async with ClientPool() as pool:
+            return await send_message(message, base_url, context_id, streaming, consumer, pool, on_artifact)
+
+    started = time.perf_counter()
+    try:
+        client = await pool.get_client(base_url, streaming=streaming, consumer=consumer)
+        if isinstance(message, dict) and accepts_data(await pool.get_agent_card(base_url)):
+            outbound_msg = create_message(data=message, context_id=context_id, metadata=tracing.inject_context())
+        else:
+            text = json.dumps(message) if isinstance(message, dict) else message
+            outbound_msg = create_message(text=text, context_id=context_id, metadata=tracing.inject_context())
         outputs = {
             "response": "",
-            "context_id": None
+            "context_id": None,
+            "data": [],
+            "artifacts": {},
+            "status": None
         }
         
         last_task = None
         async for event in client.send_message(outbound_msg):
-            print(f"[CLIENT] Event type: {type(event).__name__}", flush=True)
-            # A2A SDK returns tuples of (Task, Event) or just Message
-            if isinstance(event, tuple):
-                task, status_event = event
-                last_task = task
-                print(f"[CLIENT] Tuple - Task: {type(task).__name__}, Event: {type(status_event).__name__}", flush=True)
-                # Check if the status event has the completed state
-                if hasattr(status_event, 'status'):
-                    status = status_event.status
-                    print(f"[CLIENT] Status state: {status.state if status else 'None'}", flush=True)
-                    if status and status.state:
-                        if status.state.value == 'completed':
-                            if status.message and status.message.parts:
-                                outputs["response"] = merge_parts(status.message.parts)
+            logger.debug("Event type: %s", type(event).__name__, extra=sampled())
+            # (Task, update) tuples are counted by their update, (Task, None) as a Task
+            update = (event[1] or event[0]) if isinstance(event, tuple) else event
+            metrics.a2a_events_total.inc(event=type(update).__name__)
+            with tracing.span("a2a.event", agent=base_url, event=type(update).__name__):
+                # A2A SDK returns tuples of (Task, Event) or just Message
+                if isinstance(event, tuple):
+                    task, status_event = event
+                    last_task = task
+                    logger.debug("Task update: %s", type(status_event).__name__, extra=sampled())
+                    if isinstance(status_event, TaskArtifactUpdateEvent):
+                        if on_artifact:
+                            await on_artifact(status_event)
+                    # Check if the status event has the completed state
+                    elif hasattr(status_event, 'status'):
+                        status = status_event.status
+                        logger.debug("Status state: %s", status.state if status else None, extra=sampled())
+                        if status and status.state:
+                            if status.state.value == 'completed':
+                                if status.message and status.message.parts:
+                                    outputs["response"] = merge_parts(status.message.parts)
+                                    outputs["data"] = data_payloads(status.message.parts)
+                                    outputs["context_id"] = task.context_id
+                                    logger.debug("Extracted completed response: %s", outputs["response"], extra=sampled())
+                            elif status.state.value == 'failed':
+                                 if status.message and status.message.parts:
+                                    outputs["response"] = f"ERROR: Task failed: {merge_parts(status.message.parts)}"
+                                    outputs["context_id"] = task.context_id
+                                    logger.warning("Remote task failed: %s", outputs["response"])
+                    elif status_event is None:
+                        logger.debug("Task snapshot, state: %s", task.status.state if task.status else None,
+                                     extra=sampled())
+
+                        # Check if task itself has the completed status
+                        if task.status and task.status.state and task.status.state.value == 'completed':
+                            if task.status.message and task.status.message.parts:
+                                outputs["response"] = merge_parts(task.status.message.parts)
+                                outputs["data"] = data_payloads(task.status.message.parts)
                                 outputs["context_id"] = task.context_id
-                                print(f"[CLIENT] Extracted completed response: {outputs['response'][:100]}...", flush=True)
-                        elif status.state.value == 'failed':
-                             if status.message and status.message.parts:
-                                outputs["response"] = f"ERROR: Task failed: {merge_parts(status.message.parts)}"
+                                logger.debug("Extracted from task: %s", outputs["response"], extra=sampled())
+                        elif task.status and task.status.state and task.status.state.value == 'failed':
+                            if task.status.message and task.status.message.parts:
+                                outputs["response"] = f"ERROR: Task failed: {merge_parts(task.status.message.parts)}"
                                 outputs["context_id"] = task.context_id
-                                print(f"[CLIENT] Task failed: {outputs['response']}", flush=True)
-                elif status_event is None:
-                    print(f"[CLIENT] Got (Task, None). Task status: {task.status}", flush=True)
-                    if task.status:
-                        print(f"[CLIENT] Task state: {task.status.state}", flush=True)
-                        if task.status.message:
-                             print(f"[CLIENT] Task message parts: {len(task.status.message.parts)}", flush=True)
-
-                    # Check if task itself has the completed status
-                    if task.status and task.status.state and task.status.state.value == 'completed':
-                        if task.status.message and task.status.message.parts:
-                            outputs["response"] = merge_parts(task.status.message.parts)
-                            outputs["context_id"] = task.context_id
-                            print(f"[CLIENT] Extracted from task: {outputs['response'][:100]}...", flush=True)
-            elif isinstance(event, Message):
-                outputs["context_id"] = event.context_id
-                outputs["response"] = merge_parts(event.parts)
-                print(f"[CLIENT] Message response: {outputs['response'][:100]}...", flush=True)
-            elif isinstance(event, Task):
-                last_task = event
-                print(f"[CLIENT] Task status: {event.status.state if event.status else 'None'}", flush=True)
-                if event.status and event.status.state:
-                    if event.status.state.value == 'completed':
-                        if event.status.message and event.status.message.parts:
-                            outputs["response"] = merge_parts(event.status.message.parts)
-                            outputs["context_id"] = event.context_id
-                    elif event.status.state.value == 'failed':
-                        if event.status.message and event.status.message.parts:
-                            outputs["response"] = f"ERROR: Task failed: {merge_parts(event.status.message.parts)}"
-                            outputs["context_id"] = event.context_id
-                            print(f"[CLIENT] Task failed: {outputs['response']}", flush=True)
+                                logger.warning("Remote task failed: %s", outputs["response"])
+                elif isinstance(event, Message):
+                    outputs["context_id"] = event.context_id
+                    outputs["response"] = merge_parts(event.parts)
+                    outputs["data"] = data_payloads(event.parts)
+                    outputs["status"] = "completed"
+                    logger.debug("Message response: %s", outputs["response"], extra=sampled())
+                elif isinstance(event, Task):
+                    last_task = event
+                    logger.debug("Task status: %s", event.status.state if event.status else None, extra=sampled())
+                    if event.status and event.status.state:
+                        if event.status.state.value == 'completed':
+                            if event.status.message and event.status.message.parts:
+                                outputs["response"] = merge_parts(event.status.message.parts)
+                                outputs["data"] = data_payloads(event.status.message.parts)
+                                outputs["context_id"] = event.context_id
+                        elif event.status.state.value == 'failed':
+                            if event.status.message and event.status.message.parts:
+                                outputs["response"] = f"ERROR: Task failed: {merge_parts(event.status.message.parts)}"
+                                outputs["context_id"] = event.context_id
+                                logger.warning("Remote task failed: %s", outputs["response"])
+
+        if last_task and last_task.status and last_task.status.state:
+            outputs["status"] = last_task.status.state.value
+        # The client-side task has every artifact chunk merged, streamed or not
+        if last_task and last_task.artifacts:
+            outputs["artifacts"] = {
+                artifact.name or artifact.artifact_id: artifact.parts for artifact in last_task.artifacts
+            }
         
-        print(f"[CLIENT] Final response length: {len(outputs['response'])}", flush=True)
-        return outputs
\ No newline at end of file
+    except (httpx.HTTPError, A2AClientError):
+        # The agent may have restarted or moved; resolve its card again next time
+        pool.invalidate(base_url)
+        raise
+    finally:
+        metrics.send_message_seconds.observe(time.perf_counter() - started, agent=base_url)
+
+    logger.debug("Final response length: %d", len(outputs["response"]))
+    return outputs
\ No newline at end of file
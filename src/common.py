@@ -18,15 +18,50 @@ class TranslatorEval(BaseModel):
     relevance: float = Field(description="Score for relevance (0-10).")
     winner: str = Field(description="The role of the winning agent (e.g., 'researcher_translator') or 'N/A'.")
 
+class CaseEvaluation(TranslatorEval):
+    """A TranslatorEval tagged with the case it belongs to, used when judging cases in batches."""
+    case_id: int = Field(description="The number of the evaluated case.")
+
+class ParticipantEvaluation(TranslatorEval):
+    """A TranslatorEval tagged with the participant it scores, used in comparative judging."""
+    participant: str = Field(description="The role of the participant whose translation is evaluated.")
+
+class ComparativeEvaluation(BaseModel):
+    """Scores of every participant's translation of one case, judged side by side."""
+    evaluations: List[ParticipantEvaluation] = Field(description="One evaluation per participant.")
+    winner: str = Field(description="The role of the participant with the best translation, or 'N/A'.")
+
+# Placeholder translation of a case the participant did not translate
+TRANSLATION_ERROR_PREFIX = "// Error:"
+
+# Spellings of language names mapped to the canonical name used by the local judge and sandbox
+LANGUAGE_ALIASES = {
+    "py": "python", "python3": "python",
+    "js": "javascript", "node": "javascript", "nodejs": "javascript",
+    "ts": "typescript",
+    "c++": "cpp", "cxx": "cpp",
+    "golang": "go",
+    "rs": "rust",
+    "rb": "ruby",
+    "sh": "bash", "shell": "bash",
+    "c#": "csharp", "cs": "csharp",
+}
+
+
+def normalize_language(language: str) -> str:
+    language = language.strip().lower()
+    return LANGUAGE_ALIASES.get(language, language)
+
 def translator_judge_agent_card(name: str, url: str):
     return AgentCard(
         name=name,
         url=url,
         version="1.0.0",
         description="An agent that evaluates code translations.",
-        capabilities=AgentCapabilities(),
-        default_input_modes=["text/plain"],
-        default_output_modes=["text/plain"],
+        capabilities=AgentCapabilities(streaming=True),
+        # Requests may come as JSON text or as a DataPart; results are DataParts
+        default_input_modes=["text/plain", "application/json"],
+        default_output_modes=["text/plain", "application/json"],
         skills=[
             AgentSkill(
                 id="evaluate_translation",
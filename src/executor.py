@@ -1,3 +1,6 @@
+import asyncio
+import logging
+import time
 from abc import abstractmethod
 from pydantic import ValidationError
 
@@ -5,10 +8,10 @@ from a2a.server.agent_execution import AgentExecutor, RequestContext
 from a2a.server.events import EventQueue
 from a2a.server.tasks import TaskUpdater
 from a2a.types import (
+    DataPart,
     InvalidParamsError,
     Task,
     TaskState,
-    UnsupportedOperationError,
     InternalError,
 )
 from a2a.utils import (
@@ -17,7 +20,22 @@ from a2a.utils import (
 )
 from a2a.utils.errors import ServerError
 
+from src import metrics, tracing
 from src.common import EvalRequest
+from src.logging_setup import sampled
+from src.task_store import SqliteTaskStore
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks for a cancel request received by another server worker
+CANCEL_POLL_INTERVAL = 1.0
+
+
+def root_cause(error: BaseException) -> BaseException:
+    """The first leaf of an exception group (e.g. from a TaskGroup), or ``error`` itself."""
+    while isinstance(error, BaseExceptionGroup) and error.exceptions:
+        error = error.exceptions[0]
+    return error
 
 
 class GreenAgent:
@@ -31,21 +49,42 @@ class GreenAgent:
 
 
 class GreenExecutor(AgentExecutor):
-    def __init__(self, green_agent: GreenAgent):
+    def __init__(self, green_agent: GreenAgent, task_store: SqliteTaskStore | None = None):
         self.agent = green_agent
         self.name = "GreenExecutor"
+        # run_eval tasks in flight, by A2A task id, so they can be canceled
+        self._running: dict[str, asyncio.Task] = {}
+        # Set once cancel() has answered on its queue, which the SDK closes when execute returns
+        self._cancel_reported: dict[str, asyncio.Event] = {}
+        # Relays cancel requests to the worker running a task when several serve the port
+        self._task_store = task_store
+
+    async def _watch_cancel_requests(self, task_id: str, eval_task: asyncio.Task) -> None:
+        while not eval_task.done():
+            await asyncio.sleep(CANCEL_POLL_INTERVAL)
+            if await self._task_store.cancel_requested(task_id):
+                logger.info("Cancel requested for task %s through the task store", task_id)
+                eval_task.cancel()
+                return
 
     async def execute(self, context: RequestContext, event_queue: EventQueue) -> None:
+        # The request is read from a DataPart as is, or parsed from the message text
+        request_data = next(
+            (part.root.data for part in context.message.parts if isinstance(part.root, DataPart)), None
+        ) if context.message else None
         request_text = context.get_user_input()
-        print(f"[DEBUG] Received request_text: {request_text}", flush=True)
+        logger.debug("Received request: %s", request_data or request_text, extra=sampled())
         try:
-            req: EvalRequest = EvalRequest.model_validate_json(request_text)
-            print(f"[DEBUG] Parsed EvalRequest: {req}", flush=True)
+            if request_data is not None:
+                req: EvalRequest = EvalRequest.model_validate(request_data)
+            else:
+                req: EvalRequest = EvalRequest.model_validate_json(request_text)
+            logger.info("Evaluating %d participant(s): %s", len(req.participants), ", ".join(req.participants))
             ok, msg = self.agent.validate_request(req)
             if not ok:
                 raise ServerError(error=InvalidParamsError(message=msg))
         except ValidationError as e:
-            print(f"[DEBUG] Validation error: {e.json()}", flush=True)
+            logger.warning("Invalid request: %s", e.json())
             raise ServerError(error=InvalidParamsError(message=e.json()))
 
         msg = context.message
@@ -61,11 +100,63 @@ class GreenExecutor(AgentExecutor):
             new_agent_text_message(f"Starting assessment.", context_id=context.context_id)
         )
 
-        try:
-            await self.agent.run_eval(req, updater)
-        except Exception as e:
-            await updater.failed(new_agent_text_message(f"Agent error: {e}", context_id=context.context_id))
-            raise ServerError(error=InternalError(message=str(e)))
+        # Joins the caller's trace when its message carries a trace context
+        with tracing.span("green_agent.execute", context=tracing.extract_context(msg.metadata),
+                          task_id=task.id, participants=len(req.participants)):
+            eval_task = asyncio.create_task(self.agent.run_eval(req, updater))
+            self._running[task.id] = eval_task
+            watcher = None
+            if self._task_store is not None:
+                watcher = asyncio.create_task(self._watch_cancel_requests(task.id, eval_task))
+            started = time.perf_counter()
+            outcome = "completed"
+            metrics.evaluations_in_flight.inc()
+            try:
+                await eval_task
+            except asyncio.CancelledError:
+                outcome = "canceled"
+                if asyncio.current_task().cancelling():
+                    # The executor itself is being torn down; take the evaluation with it
+                    eval_task.cancel()
+                    raise
+                # Canceled through cancel(); run_eval has already reported the partial result
+                if (reported := self._cancel_reported.get(task.id)) is not None:
+                    await reported.wait()
+            except Exception as e:
+                outcome = "failed"
+                cause = root_cause(e)
+                logger.error("Evaluation of task %s failed", task.id, exc_info=cause)
+                detail = str(cause) or type(cause).__name__
+                await updater.failed(new_agent_text_message(f"Agent error: {detail}", context_id=context.context_id))
+                raise ServerError(error=InternalError(message=detail))
+            finally:
+                metrics.evaluations_in_flight.dec()
+                metrics.evaluation_seconds.observe(time.perf_counter() - started, outcome=outcome)
+                self._running.pop(task.id, None)
+                self._cancel_reported.pop(task.id, None)
+                if watcher is not None:
+                    watcher.cancel()
 
     async def cancel(self, request: RequestContext, event_queue: EventQueue) -> Task | None:
-        raise ServerError(error=UnsupportedOperationError())
\ No newline at end of file
+        eval_task = self._running.get(request.task_id)
+        if eval_task is None:
+            # Not running in this process: another worker may be running it and will
+            # report its partial result once it sees the request
+            if self._task_store is not None:
+                await self._task_store.request_cancel(request.task_id)
+            updater = TaskUpdater(event_queue, request.task_id, request.context_id)
+            await updater.cancel(new_agent_text_message("Assessment canceled.", context_id=request.context_id))
+            return None
+
+        # Cancelling interrupts in-flight translation and judge calls; run_eval then
+        # emits an aggregate over the completed cases and marks the task canceled.
+        reported = self._cancel_reported.setdefault(request.task_id, asyncio.Event())
+        eval_task.cancel()
+        try:
+            await asyncio.wait({eval_task})
+            # The SDK answers tasks/cancel from this queue, not from the one run_eval reports to
+            updater = TaskUpdater(event_queue, request.task_id, request.context_id)
+            await updater.cancel(new_agent_text_message("Assessment canceled.", context_id=request.context_id))
+        finally:
+            reported.set()
+        return None
\ No newline at end of file
@@ -0,0 +1,137 @@
+import json
+import re
+from collections.abc import Iterator
+
+from src.common import normalize_language
+
+# Keys a participant may put its translation under, in order of preference
+TRANSLATION_KEYS = ("translated_code", "code", "content", "message")
+
+_FENCE = "```"
+# Where a JSON object can start: a brace followed by a key or the closing brace.
+# Braces in code ("{ return x; }") never match, so plain code is skipped in one search.
+_JSON_OBJECT_START_PATTERN = re.compile(r'\{\s*["}]')
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _find_fence(text: str, position: int) -> int:
+    """Index of the next ``` from ``position`` that starts a line (after optional indentation), or -1.
+
+    A ``` quoted inside a sentence is not a fence.
+    """
+    while (index := text.find(_FENCE, position)) != -1:
+        if not text[text.rfind("\n", 0, index) + 1:index].strip(" \t"):
+            return index
+        position = index + len(_FENCE)
+    return -1
+
+
+def fenced_blocks(text: str) -> list[tuple[str, str]]:
+    """``(language tag, body)`` of every ```-fenced block, in one pass over ``text``."""
+    blocks = []
+    position = 0
+    while (start := _find_fence(text, position)) != -1:
+        header_end = text.find("\n", start + len(_FENCE))
+        if header_end == -1:
+            break
+        end = _find_fence(text, header_end + 1)
+        if end == -1:
+            break
+        info = text[start + len(_FENCE):header_end].split()
+        blocks.append((info[0].lower() if info else "", text[header_end + 1:end]))
+        position = end + len(_FENCE)
+    return blocks
+
+
+def iter_json_objects(text: str) -> Iterator[dict]:
+    """Yield the JSON objects embedded in ``text`` (e.g. in prose around them), outermost first.
+
+    Each place an object can start is parsed in place by the C decoder, which
+    handles nesting and braces inside strings and stops at the object's end.
+    A candidate that is not valid JSON is skipped, so objects nested inside it
+    are still found.
+    """
+    position = 0
+    while match := _JSON_OBJECT_START_PATTERN.search(text, position):
+        try:
+            value, end = _JSON_DECODER.raw_decode(text, match.start())
+        except (ValueError, RecursionError):
+            position = match.start() + 1
+            continue
+        yield value
+        position = end
+
+
+def extract_json_object(text: str) -> dict | None:
+    """The first JSON object in a model's text answer, which may wrap it in prose or a fence."""
+    stripped = text.strip()
+    if stripped.startswith("{"):
+        try:
+            value = json.loads(stripped)
+            if isinstance(value, dict):
+                return value
+        except (ValueError, RecursionError):
+            pass
+    return next(iter_json_objects(text), None)
+
+
+def code_from_payload(payload) -> str | None:
+    """Translated code from a structured payload: a string, or an object keyed by ``TRANSLATION_KEYS``."""
+    if isinstance(payload, str):
+        return payload or None
+    if isinstance(payload, dict):
+        for key in TRANSLATION_KEYS:
+            value = payload.get(key)
+            if isinstance(value, str) and value:
+                return value
+    return None
+
+
+def extract_code(response: str, data: list | None = None, language: str | None = None) -> str | None:
+    """Pull the translated code out of a participant's answer.
+
+    Structured ``data`` payloads (the DataParts of the answer) are used as
+    they are. The text ``response`` is tried, in order, as a JSON document, as
+    Markdown (the fenced block tagged with ``language``, else the longest one)
+    and as prose around a ``{"translated_code": ...}`` object; otherwise the
+    whole response is the code. Returns None for an empty answer.
+    """
+    for payload in data or ():
+        if code := code_from_payload(payload):
+            return code
+
+    text = response.strip()
+    if not text:
+        return None
+
+    # --- JSON ---
+    if text[0] in '{"':
+        try:
+            if code := code_from_payload(json.loads(text)):
+                return code
+        except (ValueError, RecursionError):
+            pass
+
+    # --- MARKDOWN ---
+    blocks = []
+    for tag, body in fenced_blocks(text):
+        if tag == "json":
+            try:
+                body = code_from_payload(json.loads(body)) or body
+            except (ValueError, RecursionError):
+                pass
+        blocks.append((tag, body.strip()))
+    if blocks:
+        wanted = normalize_language(language) if language else None
+        tagged = [body for tag, body in blocks if wanted and tag and normalize_language(tag) == wanted]
+        if code := max(tagged or [body for _, body in blocks], key=len):
+            return code
+
+    # --- EMBEDDED JSON ---
+    # Only the explicit key, so dict literals in plain code are not mistaken for an answer
+    for value in iter_json_objects(text):
+        if isinstance(code := value.get("translated_code"), str) and code:
+            return code
+
+    # --- RAW ---
+    return text
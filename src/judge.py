@@ -0,0 +1,480 @@
+import asyncio
+import logging
+import os
+import time
+from abc import abstractmethod
+from typing import TYPE_CHECKING
+
+from src import metrics, tracing
+from src.common import TranslatorEval, CaseEvaluation, ComparativeEvaluation
+from src.extraction import extract_json_object
+from src.judge_cache import JudgeCache
+from src.model_router import ModelRouter, error_status
+from src.prefix_cache import PromptPrefixCache
+from src.rate_limiter import (
+    RATE_LIMIT_STATE_PATH, RateLimiter, SharedRateLimiter, estimate_tokens, retry_delay
+)
+
+if TYPE_CHECKING:
+    from google import genai
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = '''
+you are an expert evaluation agent specialized in evaluating code and programming languages translation and
+how efficient it is to run without errors, and judging a successful translation requires the following
+considerations:
+
+    - it does not produce error when it runs.
+    - it is styled and commented in the new language method.
+    - it is concise and does not have extra non relevant code.
+    - it is clear and relevant to the topic.
+
+the format of the output translation is as follows, containing at least two points of them with requirement for the first one:
+
+    1 - the translation: the translation of the code in the new language.
+    2 - it keeps the same functionality of the original code.
+    3 - it have the same structure and logic of the original code.
+
+the translation needs to start with a note about the current language and the new language.
+
+in general the translation needs to be clear, clean and error free.
+'''
+
+# Every judge prompt starts with the rubric; JSON-mode models get it as a (cached) system instruction
+PROMPT_PREFIX = f"\n{SYSTEM_PROMPT}\n"
+
+# Models that support JSON mode with schema (ordered by preference)
+JSON_SUPPORTED_MODELS = [
+    "gemini-2.5-flash-lite",
+    "gemini-2.0-flash-lite",
+    "gemini-2.0-flash",
+    "gemini-2.5-flash",
+    "gemini-2.0-flash-001",
+    "gemini-2.0-flash-lite-001",
+    "gemini-flash-latest",
+    "gemini-flash-lite-latest",
+    "gemini-pro-latest",
+    "gemini-2.5-pro",
+    "gemini-exp-1206",
+    "gemini-3-flash-preview",
+    "gemini-3-pro-preview"
+]
+
+# Text-only models (Gemma and experimental) - use text mode and parse manually
+TEXT_ONLY_MODELS = [
+    "gemma-3-1b-it",
+    "gemma-3-4b-it",
+    "gemma-3-12b-it",
+    "gemma-3-27b-it",
+    "gemma-3n-e2b-it",
+    "gemma-3n-e4b-it"
+]
+
+# Model health and Gemini quotas are shared by every evaluation running in this process
+# (quotas by every server worker too when RATE_LIMIT_STATE_PATH is set)
+model_router = ModelRouter(JSON_SUPPORTED_MODELS + TEXT_ONLY_MODELS)
+rate_limiter = SharedRateLimiter(RATE_LIMIT_STATE_PATH) if RATE_LIMIT_STATE_PATH else RateLimiter()
+# The rubric is cached once per model and process, and reused by every case
+prefix_cache = PromptPrefixCache()
+
+# Longest time a case waits for a cooling-down model before falling back to a zero score
+MAX_ROUTER_WAIT = 60.0
+
+
+def _record_attempt(model: str, outcome: str, started: float | None, attempt=None) -> None:
+    if attempt is not None:
+        attempt.set_attribute("outcome", outcome)
+    if started is not None:
+        metrics.judge_attempt_seconds.observe(time.monotonic() - started, model=model, outcome=outcome)
+    metrics.judge_attempts_total.inc(model=model, outcome=outcome)
+
+
+FAILED_EVALUATION_REASONING = "Evaluation failed for "
+
+
+def failed_evaluation(case_label: str) -> TranslatorEval:
+    """Zero-score verdict used when a case could not be judged."""
+    return TranslatorEval(
+        reasoning=f"{FAILED_EVALUATION_REASONING}{case_label}",
+        winner="N/A",
+        execution_correctness=0,
+        style_score=0,
+        conciseness=0,
+        relevance=0
+    )
+
+
+def is_failed_evaluation(evaluation: TranslatorEval) -> bool:
+    return evaluation.winner == "N/A" and evaluation.reasoning.startswith(FAILED_EVALUATION_REASONING)
+
+
+class Judge:
+    """Backend that scores a participant's translation of a test case."""
+
+    @abstractmethod
+    async def judge_case(self, case_label: str, role: str, code_to_translate: str, translated_code: str,
+                         source_language: str, target_language: str, use_cache: bool = True) -> TranslatorEval:
+        pass
+
+    async def judge_batch(self, cases: list[tuple[int, str, str]], total: int, role: str,
+                          source_language: str, target_language: str,
+                          use_cache: bool = True) -> dict[int, TranslatorEval]:
+        """Judge ``(index, code_to_translate, translated_code)`` cases; by default one at a time."""
+        evaluations = await asyncio.gather(*(
+            self.judge_case(
+                f"Case {i+1}/{total}", role, code_to_translate, translated_code, source_language, target_language,
+                use_cache=use_cache
+            )
+            for i, code_to_translate, translated_code in cases
+        ))
+        return {i: case_eval for (i, _, _), case_eval in zip(cases, evaluations)}
+
+    async def judge_comparison(self, case_label: str, code_to_translate: str, translations: dict[str, str],
+                               source_language: str, target_language: str,
+                               use_cache: bool = True) -> dict[str, TranslatorEval]:
+        """Judge every participant's translation of one case; by default each on its own."""
+        evaluations = await asyncio.gather(*(
+            self.judge_case(
+                case_label, role, code_to_translate, translated_code, source_language, target_language,
+                use_cache=use_cache
+            )
+            for role, translated_code in translations.items()
+        ))
+        return dict(zip(translations, evaluations))
+
+
+class GeminiJudge(Judge):
+    """Judge that asks Gemini (falling back across models) to score translations."""
+
+    def __init__(self, client: "genai.Client | None" = None):
+        # The Gemini client (and the SDK) is only loaded once a case is judged
+        self._client = client
+        # Why the client could not be created; missing credentials are not retried every case
+        self._client_error: Exception | None = None
+        # Verdicts are reused across evaluations and server restarts
+        self._judge_cache = JudgeCache()
+        self._model_router = model_router
+        self._rate_limiter = rate_limiter
+        self._prefix_cache = prefix_cache
+
+    @property
+    def client(self) -> "genai.Client":
+        if self._client is None:
+            if self._client_error is not None:
+                raise self._client_error.with_traceback(None)
+            from google import genai
+
+            try:
+                self._client = genai.Client(api_key=os.environ.get("GOOGLE_API_KEY"))
+            except Exception as e:
+                self._client_error = e
+                logger.error("Could not create the Gemini client, no case will be judged: %s", e)
+                raise
+        return self._client
+
+    @staticmethod
+    def build_prompt(role: str, code_to_translate: str, translated_code: str,
+                      source_language: str, target_language: str) -> str:
+        return f"""
+{SYSTEM_PROMPT}
+
+Please evaluate the following code translation based on the criteria:
+- Execution Correctness
+- Style & Documentation
+- Conciseness
+- Relevance
+
+Original {source_language} code:
+```
+{code_to_translate}
+```
+
+Translated {target_language} code (from participant '{role}'):
+```
+{translated_code}
+```
+
+Provide your evaluation in the TranslatorEval schema, including reasoning, winner (participant's role or 'N/A'), execution_correctness, style_score, conciseness, and relevance.
+"""
+
+    async def judge_case(self, case_label: str, role: str, code_to_translate: str, translated_code: str,
+                          source_language: str, target_language: str, use_cache: bool = True) -> TranslatorEval:
+        # --- EVALUATION STEP ---
+        prompt = self.build_prompt(role, code_to_translate, translated_code, source_language, target_language)
+        models_to_try = JSON_SUPPORTED_MODELS + TEXT_ONLY_MODELS
+
+        # A cached verdict for the exact same prompt skips the whole fallback loop
+        if use_cache:
+            cached = await self._judge_cache.get(prompt, models_to_try)
+            if cached:
+                model, case_eval = cached
+                logger.debug("Judge cache hit for %s (model %s)", case_label, model)
+                metrics.judge_cache_hits_total.inc()
+                return case_eval
+
+        case_eval = None
+        generated = await self._generate(prompt, case_label, role, TranslatorEval)
+        if generated:
+            model, case_eval = generated
+            if use_cache:
+                await self._judge_cache.put(prompt, model, case_eval)
+
+        if not case_eval:
+            # Fallback if evaluation fails
+            case_eval = failed_evaluation(case_label)
+        
+        return case_eval
+
+    async def judge_batch(self, cases: list[tuple[int, str, str]], total: int, role: str,
+                           source_language: str, target_language: str,
+                           use_cache: bool = True) -> dict[int, TranslatorEval]:
+        """Judge several ``(index, code_to_translate, translated_code)`` cases with one request.
+
+        The rubric is sent once for the whole batch and the model answers with a
+        list of CaseEvaluation items, matched back to the cases by ``case_id``.
+        Cases that are missing from (or unparseable in) the answer are judged
+        individually with ``judge_case``.
+        """
+        results: dict[int, TranslatorEval] = {}
+        models_to_try = JSON_SUPPORTED_MODELS + TEXT_ONLY_MODELS
+        prompts = {
+            i: self.build_prompt(role, code_to_translate, translated_code, source_language, target_language)
+            for i, code_to_translate, translated_code in cases
+        }
+        if use_cache:
+            for i, prompt in prompts.items():
+                cached = await self._judge_cache.get(prompt, models_to_try)
+                if cached:
+                    results[i] = cached[1]
+                    metrics.judge_cache_hits_total.inc()
+            cases = [case for case in cases if case[0] not in results]
+
+        if len(cases) > 1:
+            sections = "\n".join(
+                f"""
+### Case {i+1}
+
+Original {source_language} code:
+```
+{code_to_translate}
+```
+
+Translated {target_language} code (from participant '{role}'):
+```
+{translated_code}
+```
+""" for i, code_to_translate, translated_code in cases)
+            prompt = f"""
+{SYSTEM_PROMPT}
+
+Please evaluate each of the following {len(cases)} code translations independently based on the criteria:
+- Execution Correctness
+- Style & Documentation
+- Conciseness
+- Relevance
+{sections}
+Provide one evaluation per case as a list in the CaseEvaluation schema, including case_id (the number after "Case"), reasoning, winner (participant's role or 'N/A'), execution_correctness, style_score, conciseness, and relevance.
+"""
+            batch_label = f"Cases {', '.join(str(i+1) for i, _, _ in cases)}/{total}"
+            # Gemma models cannot return a schema-constrained list, so only JSON models are tried
+            generated = await self._generate(prompt, batch_label, role, list[CaseEvaluation], json_only=True)
+            if generated:
+                model, batch_evals = generated
+                expected = {i + 1: i for i, _, _ in cases}
+                for case_eval in batch_evals:
+                    i = expected.get(case_eval.case_id)
+                    if i is not None and i not in results:
+                        results[i] = TranslatorEval.model_validate(case_eval.model_dump(exclude={"case_id"}))
+                        # Cached under the per-case prompt so later runs hit regardless of batching
+                        if use_cache:
+                            await self._judge_cache.put(prompts[i], model, results[i])
+
+        # Per-case judging for whatever the batch did not cover; individual
+        # verdicts also land in the judge cache.
+        missing = [case for case in cases if case[0] not in results]
+        evaluations = await asyncio.gather(*(
+            self.judge_case(
+                f"Case {i+1}/{total}", role, code_to_translate, translated_code, source_language, target_language,
+                use_cache=use_cache
+            )
+            for i, code_to_translate, translated_code in missing
+        ))
+        for (i, _, _), case_eval in zip(missing, evaluations):
+            results[i] = case_eval
+        return results
+
+    async def judge_comparison(self, case_label: str, code_to_translate: str, translations: dict[str, str],
+                               source_language: str, target_language: str,
+                               use_cache: bool = True) -> dict[str, TranslatorEval]:
+        """Judge all participants' translations of one case side by side in a single request.
+
+        Every evaluation carries the winner the model picked. If the answer is
+        missing or does not cover every participant, each translation is
+        judged on its own instead.
+        """
+        sections = "\n".join(f"""
+### Participant '{role}'
+
+```
+{translated_code}
+```
+""" for role, translated_code in translations.items())
+        prompt = f"""
+{SYSTEM_PROMPT}
+
+Please compare the following {len(translations)} translations of the same code based on the criteria:
+- Execution Correctness
+- Style & Documentation
+- Conciseness
+- Relevance
+
+Original {source_language} code:
+```
+{code_to_translate}
+```
+
+Translated {target_language} code by each participant:
+{sections}
+Provide your answer in the ComparativeEvaluation schema: one evaluation per participant (participant role, reasoning, execution_correctness, style_score, conciseness, relevance, and winner set to the overall winner) and the winner (role of the participant with the best translation, or 'N/A' if none is acceptable).
+"""
+        models_to_try = JSON_SUPPORTED_MODELS + TEXT_ONLY_MODELS
+        # Each participant's verdict is cached under the prompt plus its role
+        keys = {role: f"{prompt}\nParticipant: {role}" for role in translations}
+        if use_cache:
+            cached = {role: await self._judge_cache.get(key, models_to_try) for role, key in keys.items()}
+            if all(cached.values()):
+                logger.debug("Judge cache hit for %s (comparison)", case_label)
+                metrics.judge_cache_hits_total.inc(len(cached))
+                return {role: hit[1] for role, hit in cached.items()}
+
+        # Gemma models cannot return the nested schema, so only JSON models are tried
+        generated = await self._generate(prompt, case_label, "N/A", ComparativeEvaluation, json_only=True)
+        if generated:
+            model, comparison = generated
+            winner = comparison.winner if comparison.winner in translations else "N/A"
+            results = {
+                evaluation.participant: TranslatorEval.model_validate(
+                    evaluation.model_dump(exclude={"participant"}) | {"winner": winner}
+                )
+                for evaluation in comparison.evaluations if evaluation.participant in translations
+            }
+            if len(results) == len(translations):
+                if use_cache:
+                    for role, evaluation in results.items():
+                        await self._judge_cache.put(keys[role], model, evaluation)
+                return results
+            logger.info("Comparison for %s did not cover every participant, judging separately", case_label)
+
+        return await super().judge_comparison(
+            case_label, code_to_translate, translations, source_language, target_language, use_cache=use_cache
+        )
+
+    async def _split_prompt(self, model: str, prompt: str) -> tuple[str, dict]:
+        """Contents to send to ``model`` and the config fields carrying the prompt's rubric prefix."""
+        if not prompt.startswith(PROMPT_PREFIX):
+            return prompt, {}
+        contents = prompt[len(PROMPT_PREFIX):]
+        if cached_content := await self._prefix_cache.get(self.client, model, PROMPT_PREFIX):
+            return contents, {"cached_content": cached_content}
+        return contents, {"system_instruction": PROMPT_PREFIX}
+
+    async def _generate(self, prompt: str, label: str, role: str, response_schema, json_only: bool = False):
+        """Run ``prompt`` through the judge models, returning ``(model, parsed)`` or None if every model failed."""
+        # The shared router orders healthy models by observed latency and success
+        # rate and skips models whose circuit is open (rate limited, deprecated).
+        candidates = self._model_router.candidates()
+        if not candidates:
+            wait = self._model_router.next_available_in()
+            if wait <= MAX_ROUTER_WAIT:
+                logger.info("All judge models cooling down, waiting %.1fs for %s", wait, label)
+                await asyncio.sleep(wait)
+                candidates = self._model_router.candidates()
+        if json_only:
+            candidates = [model for model in candidates if model in JSON_SUPPORTED_MODELS]
+
+        # Created on first use; without credentials no model is tried (or blamed)
+        try:
+            client = self.client
+        except Exception:
+            # Already reported when the construction failed
+            logger.debug("No Gemini client to judge %s", label)
+            return None
+        prompt_tokens = estimate_tokens(prompt)
+        for depth, model in enumerate(candidates, start=1):
+            parsed = None
+            started = None
+            with tracing.span("judge.model_attempt", model=model, case=label, depth=depth) as attempt:
+                try:
+                    # Wait for this model's request/token budget before calling it
+                    await self._rate_limiter.acquire(model, prompt_tokens)
+                    started = time.monotonic()
+                    use_json_mode = model in JSON_SUPPORTED_MODELS
+                
+                    if use_json_mode:
+                        from google.genai import types
+
+                        # The rubric goes as cached content (or a system instruction), only the case as contents
+                        contents, prefix_config = await self._split_prompt(model, prompt)
+                        attempt.set_attribute("prefix_cached", "cached_content" in prefix_config)
+                        try:
+                            response = await client.aio.models.generate_content(
+                                model=model,
+                                contents=contents,
+                                config=types.GenerateContentConfig(
+                                    response_mime_type='application/json',
+                                    response_schema=response_schema,
+                                    **prefix_config
+                                )
+                            )
+                        except Exception as e:
+                            if "cached_content" in prefix_config and error_status(e) != 429:
+                                # The cached content may be gone; the next attempt creates it again
+                                self._prefix_cache.invalidate(model, PROMPT_PREFIX)
+                            raise
+                        parsed = response.parsed
+                        usage = getattr(response, "usage_metadata", None)
+                        if usage is not None and usage.cached_content_token_count:
+                            metrics.judge_cached_tokens_total.inc(usage.cached_content_token_count, model=model)
+                    else:
+                        # For Gemma models - use text mode and parse manually
+                        response = await client.aio.models.generate_content(
+                            model=model,
+                            contents=prompt
+                        )
+                        response_text = response.text
+                    
+                        # Try to parse JSON from response
+                        data = extract_json_object(response_text)
+                        if data:
+                            parsed = TranslatorEval(
+                                reasoning=data.get("reasoning", "Evaluated by Gemma model"),
+                                winner=data.get("winner", role),
+                                execution_correctness=float(data.get("execution_correctness", 5)),
+                                style_score=float(data.get("style_score", 5)),
+                                conciseness=float(data.get("conciseness", 5)),
+                                relevance=float(data.get("relevance", 5))
+                            )
+                
+                    if parsed:
+                        self._model_router.record_success(model, time.monotonic() - started)
+                        await self._rate_limiter.record_success(model)
+                        _record_attempt(model, "success", started, attempt)
+                        metrics.judge_fallback_depth.observe(depth, answered="true")
+                        return model, parsed
+                    self._model_router.record_failure(model)
+                    _record_attempt(model, "invalid", started, attempt)
+                except Exception as e:
+                    logger.warning("Model %s failed for %s: %s", model, label, e)
+                    if error_status(e) == 429:
+                        # The limiter alone backs off (honoring the server's retry delay); the router
+                        # skips the model for that long and the next model is tried
+                        delay = await self._rate_limiter.throttle(model, retry_delay(e))
+                        self._model_router.record_rate_limited(model, delay)
+                        _record_attempt(model, "rate_limited", started, attempt)
+                    else:
+                        self._model_router.record_failure(model, e)
+                        _record_attempt(model, "error", started, attempt)
+        if candidates:
+            metrics.judge_fallback_depth.observe(len(candidates), answered="false")
+        return None
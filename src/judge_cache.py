@@ -0,0 +1,75 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+
+from pydantic import ValidationError
+
+from src.common import TranslatorEval
+from src.sqlite_lru import SqliteLRU
+
+logger = logging.getLogger(__name__)
+
+# Location and size of the on-disk cache, overridable through the environment
+DEFAULT_JUDGE_CACHE_PATH = os.environ.get("JUDGE_CACHE_PATH", ".cache/judge_cache.sqlite3")
+DEFAULT_JUDGE_CACHE_MAX_ENTRIES = int(os.environ.get("JUDGE_CACHE_MAX_ENTRIES", "10000"))
+
+
+class JudgeCache:
+    """Persistent, size-bounded LRU cache of judge verdicts.
+
+    Entries are keyed by a SHA-256 of the full judge prompt (which embeds the
+    rubric, languages, original and translated code) and the model name, and
+    store the parsed ``TranslatorEval`` as JSON in a local SQLite file. Once
+    more than ``max_entries`` verdicts are stored, the least recently used
+    ones are evicted.
+    """
+
+    def __init__(self, path: str = DEFAULT_JUDGE_CACHE_PATH, max_entries: int = DEFAULT_JUDGE_CACHE_MAX_ENTRIES):
+        self._table = SqliteLRU(path, "judge_cache", max_entries)
+
+    @staticmethod
+    def make_key(prompt: str, model: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(model.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(prompt.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _get(self, prompt: str, models: list[str]) -> tuple[str, TranslatorEval] | None:
+        keys = {self.make_key(prompt, model): model for model in models}
+        verdicts = self._table.get_many(list(keys))
+        if not verdicts:
+            return None
+        # Prefer the verdict of the model that comes first in the fallback order
+        order = {model: i for i, model in enumerate(models)}
+        key = min(verdicts, key=lambda key: order[keys[key]])
+        try:
+            evaluation = TranslatorEval.model_validate_json(verdicts[key])
+        except ValidationError:
+            self._table.delete(key)
+            return None
+        self._table.touch(key)
+        return keys[key], evaluation
+
+    def _put(self, prompt: str, model: str, evaluation: TranslatorEval) -> None:
+        self._table.put(self.make_key(prompt, model), model, evaluation.model_dump_json())
+
+    async def get(self, prompt: str, models: list[str]) -> tuple[str, TranslatorEval] | None:
+        """Return ``(model, verdict)`` for the first of ``models`` with a cached verdict, if any."""
+        try:
+            return await asyncio.to_thread(self._get, prompt, models)
+        except sqlite3.Error as e:
+            # A busy or broken cache is a miss, not a failed evaluation
+            logger.warning("Judge cache lookup failed, judging again: %s", e)
+            return None
+
+    async def put(self, prompt: str, model: str, evaluation: TranslatorEval) -> None:
+        try:
+            await asyncio.to_thread(self._put, prompt, model, evaluation)
+        except sqlite3.Error as e:
+            logger.warning("Could not cache a judge verdict: %s", e)
+
+    def close(self) -> None:
+        self._table.close()
@@ -0,0 +1,193 @@
+import ast
+import asyncio
+import difflib
+import math
+import re
+import shutil
+
+from src.common import TRANSLATION_ERROR_PREFIX, TranslatorEval, normalize_language
+from src.judge import Judge
+from src.sandbox import execution_pool, expand_command, source_directory
+
+# Seconds a host syntax checker may run before the result counts as unknown
+SYNTAX_CHECK_TIMEOUT = 10
+
+# Host tools used to syntax-check a translation: (file suffix, command). "{file}"
+# and "{dir}" are replaced by the temporary source file and its directory.
+SYNTAX_CHECKERS = {
+    "javascript": (".js", ["node", "--check", "{file}"]),
+    "typescript": (".ts", ["tsc", "--noEmit", "--pretty", "false", "{file}"]),
+    "c": (".c", ["gcc", "-fsyntax-only", "-x", "c", "{file}"]),
+    "cpp": (".cpp", ["g++", "-fsyntax-only", "-x", "c++", "{file}"]),
+    "go": (".go", ["gofmt", "-e", "{file}"]),
+    "rust": (".rs", ["rustc", "--crate-type", "lib", "--emit=metadata", "--out-dir", "{dir}", "{file}"]),
+    "java": (".java", ["javac", "-d", "{dir}", "{file}"]),
+    "ruby": (".rb", ["ruby", "-c", "{file}"]),
+    "php": (".php", ["php", "-l", "{file}"]),
+    "bash": (".sh", ["bash", "-n", "{file}"]),
+}
+
+HASH_COMMENT_LANGUAGES = {"python", "ruby", "bash", "perl", "r"}
+DASH_COMMENT_LANGUAGES = {"sql", "lua", "haskell"}
+
+_IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+# Keywords common enough across languages that sharing them says nothing about structure
+_COMMON_KEYWORDS = {
+    "def", "return", "else", "elif", "for", "while", "class", "function", "const", "let", "var",
+    "public", "private", "protected", "static", "void", "int", "import", "from", "self", "this",
+    "new", "true", "false", "null", "none", "and", "not", "print", "console", "log", "std",
+    "include", "func", "mut", "end", "then", "string", "str", "println", "printf",
+}
+
+
+def _comment_prefixes(language: str) -> tuple[str, ...]:
+    if language in HASH_COMMENT_LANGUAGES:
+        return ("#",)
+    if language in DASH_COMMENT_LANGUAGES:
+        return ("--",)
+    return ("//", "/*", "*")
+
+
+def _line_counts(code: str, language: str) -> tuple[int, int]:
+    """Return ``(code_lines, comment_lines)`` ignoring blank lines."""
+    prefixes = _comment_prefixes(language)
+    code_lines = comment_lines = 0
+    for line in code.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped.startswith(prefixes):
+            comment_lines += 1
+        else:
+            code_lines += 1
+    return code_lines, comment_lines
+
+
+def _identifiers(code: str) -> list[str]:
+    # snake_case and camelCase spellings of a name compare equal
+    names = (name.replace("_", "").lower() for name in _IDENTIFIER_PATTERN.findall(code))
+    return [name for name in names if len(name) >= 3 and name not in _COMMON_KEYWORDS]
+
+
+def _parse_python(code: str) -> bool | None:
+    try:
+        ast.parse(code)
+        return True
+    except (SyntaxError, ValueError):
+        return False
+    except (RecursionError, MemoryError):
+        # Too deeply nested for this interpreter's parser, which says nothing about the code
+        return None
+
+
+async def check_syntax(code: str, language: str) -> bool | None:
+    """Syntax-check ``code``; None when no checker for ``language`` is available on this host
+    or it cannot tell.
+
+    Checkers take a slot of the shared execution pool, so a large evaluation
+    cannot start one compiler per case at once.
+    """
+    if language == "python":
+        # Parsing a large file takes a while; the event loop keeps serving other cases meanwhile
+        return await asyncio.to_thread(_parse_python, code)
+
+    checker = SYNTAX_CHECKERS.get(language)
+    if checker is None or shutil.which(checker[1][0]) is None:
+        return None
+    suffix, command = checker
+    async with execution_pool.slot():
+        with source_directory(code, language, suffix) as (directory, path, name):
+            process = await asyncio.create_subprocess_exec(
+                *expand_command(command, directory, path, name),
+                cwd=directory, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+            )
+            try:
+                return await asyncio.wait_for(process.wait(), SYNTAX_CHECK_TIMEOUT) == 0
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                process.kill()
+                await process.wait()
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                return None
+
+
+def _clamp(score: float) -> float:
+    return round(max(0.0, min(10.0, score)), 2)
+
+
+class LocalJudge(Judge):
+    """Deterministic offline judge built from cheap local measurements.
+
+    Scores come from a syntax check (Python's own parser or a compiler found on
+    the host), the translated/original line ratio, the comment ratio and the
+    overlap of identifiers between both versions. It needs no network access
+    or API key, so it suits pre-screening and load testing; its verdicts are
+    far coarser than the Gemini judge's.
+    """
+
+    async def judge_case(self, case_label: str, role: str, code_to_translate: str, translated_code: str,
+                         source_language: str, target_language: str, use_cache: bool = True) -> TranslatorEval:
+        if translated_code.startswith(TRANSLATION_ERROR_PREFIX):
+            return TranslatorEval(
+                reasoning=f"No translation to evaluate for {case_label}: {translated_code}",
+                winner="N/A",
+                execution_correctness=0,
+                style_score=0,
+                conciseness=0,
+                relevance=0
+            )
+
+        source_language = normalize_language(source_language)
+        target_language = normalize_language(target_language)
+        syntax_ok = await check_syntax(translated_code, target_language)
+
+        original_lines, original_comments = _line_counts(code_to_translate, source_language)
+        translated_lines, translated_comments = _line_counts(translated_code, target_language)
+
+        # Conciseness: full marks within 0.7x-1.4x of the original length
+        ratio = max(translated_lines, 1) / max(original_lines, 1)
+        conciseness = 10 - 4 * max(0.0, abs(math.log2(ratio)) - 0.5)
+
+        # Relevance: identifiers the translation kept, and whether they appear in the same order
+        original_ids = _identifiers(code_to_translate)
+        translated_ids = _identifiers(translated_code)
+        original_set = set(original_ids)
+        recall = len(original_set & set(translated_ids)) / len(original_set) if original_set else 1.0
+        order = difflib.SequenceMatcher(None, original_ids, translated_ids, autojunk=False).ratio()
+        similarity = 0.6 * recall + 0.4 * order
+        relevance = 10 * similarity
+
+        # Style: commented like the rubric asks, opening with a note about both languages
+        comment_ratio = translated_comments / max(translated_lines + translated_comments, 1)
+        original_ratio = original_comments / max(original_lines + original_comments, 1)
+        first_line = next((line.lower() for line in translated_code.splitlines() if line.strip()), "")
+        style = 6.0
+        if 0.05 <= comment_ratio <= 0.5:
+            style += 2
+        if comment_ratio >= original_ratio / 2:
+            style += 1
+        if first_line.lstrip().startswith(_comment_prefixes(target_language)) and target_language in first_line:
+            style += 1
+
+        if syntax_ok is False:
+            execution = 1.0
+            style -= 3
+        elif syntax_ok is True:
+            execution = 6 + 4 * similarity
+        else:
+            execution = 3 + 4 * similarity
+
+        syntax_note = {True: "passes", False: "fails", None: "could not be run for"}[syntax_ok]
+        return TranslatorEval(
+            reasoning=(
+                f"Local heuristic evaluation of {case_label}: the syntax check {syntax_note} the "
+                f"{target_language} code; {translated_lines} code lines vs {original_lines} original "
+                f"(ratio {ratio:.2f}); comment ratio {comment_ratio:.2f}; identifier recall {recall:.2f}, "
+                f"order similarity {order:.2f}."
+            ),
+            winner=role if syntax_ok is not False else "N/A",
+            execution_correctness=_clamp(execution),
+            style_score=_clamp(style),
+            conciseness=_clamp(conciseness),
+            relevance=_clamp(relevance)
+        )
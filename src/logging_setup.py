@@ -0,0 +1,149 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import reprlib
+import sys
+
+# Logging behaviour, overridable through the environment. LOG_LEVEL (default INFO)
+# and LOG_FORMAT ("text", or "json" for one JSON object per line) are read when
+# logging is configured, so the server's flags can set them.
+# Fraction of sampled debug records (per-event and per-payload logs) that are kept
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+# Longest rendering of a message argument or field; longer ones are cut with a marker
+LOG_MAX_FIELD_CHARS = int(os.environ.get("LOG_MAX_FIELD_CHARS", "500"))
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: logging.handlers.QueueListener | None = None
+
+# Renders containers (e.g. a whole request) without walking all of them
+_CONTAINER_REPR = reprlib.Repr()
+_CONTAINER_REPR.maxlevel = 4
+_CONTAINER_REPR.maxdict = _CONTAINER_REPR.maxlist = _CONTAINER_REPR.maxtuple = _CONTAINER_REPR.maxset = 50
+_CONTAINER_REPR.maxstring = _CONTAINER_REPR.maxother = 200
+
+
+def truncate(value, limit: int | None = None):
+    """Cut values rendered longer than ``limit`` characters, noting how much was dropped.
+
+    Strings are cut as they are. Containers become a bounded ``repr`` and
+    other objects their ``str()`` when too long; numbers and None are kept
+    so numeric placeholders still format.
+    """
+    limit = LOG_MAX_FIELD_CHARS if limit is None else limit
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        text = value
+    elif isinstance(value, (dict, list, tuple, set, frozenset)):
+        text = value = _CONTAINER_REPR.repr(value)
+    else:
+        text = str(value)
+    if len(text) > limit:
+        return f"{text[:limit]}... [{len(text) - limit} more chars]"
+    return value
+
+
+def sampled(sample_rate: float | None = None) -> dict:
+    """``extra`` marking a debug record as sampled, so only a fraction of them is emitted."""
+    return {"sample_rate": LOG_DEBUG_SAMPLE_RATE if sample_rate is None else sample_rate}
+
+
+class SamplingFilter(logging.Filter):
+    """Drop the share of records given by their ``sample_rate``; unmarked records always pass."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = getattr(record, "sample_rate", None)
+        return rate is None or rate >= 1 or random.random() < rate
+
+
+class _TruncatingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that truncates large payloads before they are queued."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if isinstance(record.args, tuple):
+            record.args = tuple(truncate(arg) for arg in record.args)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                setattr(record, key, truncate(value))
+        return super().prepare(record)
+
+
+def _fields(record: logging.LogRecord) -> dict:
+    return {key: value for key, value in vars(record).items()
+            if key not in _RECORD_ATTRIBUTES and key != "sample_rate"}
+
+
+class TextFormatter(logging.Formatter):
+    """``time LEVEL logger: message key=value ...``"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value!r}" for key, value in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the ``extra`` fields as top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_fields(record),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: str | None = None, fmt: str | None = None) -> None:
+    """Route the agent's loggers through a queue so writing to stdout never blocks the event loop.
+
+    Records are filtered (level, sampling) and truncated in the caller, then
+    formatted and written by a ``QueueListener`` thread. Calling this again
+    replaces the previous configuration.
+    """
+    global _listener
+    stop_logging()
+    level = (level or os.environ.get("LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.environ.get("LOG_FORMAT", "text")).lower()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _TruncatingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter())
+
+    logger = logging.getLogger("src")
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(queue_handler)
+    logger.setLevel(level)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,219 @@
+import math
+import threading
+import time
+from abc import abstractmethod
+from contextlib import contextmanager
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Default histogram buckets (seconds), from fast cache hits to slow model calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, ...], object] = {}
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    @abstractmethod
+    def _samples(self) -> list[str]:
+        pass
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, e.g. requests or errors."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> list[str]:
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+                for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. work in flight."""
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels: str):
+        """Count the enclosed block as in flight."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self) -> list[str]:
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+                for key, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    """Distribution of observations (cumulative buckets, sum and count)."""
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for n, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[n] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels: str):
+        """Observe the duration of the enclosed block, also when it raises or is canceled."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> list[str]:
+        lines = []
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+# Process-wide registry; with --workers each server process reports its own values
+registry = Registry()
+
+# --- EVALUATION ---
+evaluations_in_flight = registry.register(Gauge(
+    "green_agent_evaluations_in_flight", "Evaluations currently running."))
+evaluation_seconds = registry.register(Histogram(
+    "green_agent_evaluation_seconds", "Duration of whole evaluations.", ("outcome",)))
+cases_in_flight = registry.register(Gauge(
+    "green_agent_cases_in_flight", "Test cases being translated or judged.", ("stage",)))
+cases_total = registry.register(Counter(
+    "green_agent_cases_total", "Test cases judged, per participant and language pair.",
+    ("participant", "source_language", "target_language")))
+
+# --- TRANSLATION (purple agent round trip) ---
+translation_seconds = registry.register(Histogram(
+    "green_agent_translation_seconds", "Round trip of a translation request to a participant.",
+    ("participant", "source_language", "target_language")))
+translation_errors_total = registry.register(Counter(
+    "green_agent_translation_errors_total", "Translation requests that failed.", ("participant",)))
+translations_replayed_total = registry.register(Counter(
+    "green_agent_translations_replayed_total",
+    "Translations replayed from the translation store instead of asking the participant (rejudge).",
+    ("participant",)))
+
+# --- JUDGING ---
+judge_seconds = registry.register(Histogram(
+    "green_agent_judge_seconds", "Duration of one judge step (a case, batch or comparison).",
+    ("judge", "mode", "source_language", "target_language")))
+judge_attempt_seconds = registry.register(Histogram(
+    "green_agent_judge_attempt_seconds", "Duration of one Gemini call in the model fallback loop.",
+    ("model", "outcome")))
+judge_attempts_total = registry.register(Counter(
+    "green_agent_judge_attempts_total",
+    "Gemini calls by outcome (success, invalid, rate_limited, error).", ("model", "outcome")))
+judge_fallback_depth = registry.register(Histogram(
+    "green_agent_judge_fallback_depth", "Models tried per judge request, by whether one of them answered.",
+    ("answered",), buckets=(1, 2, 3, 4, 5, 8, 13, 19)))
+judge_cache_hits_total = registry.register(Counter(
+    "green_agent_judge_cache_hits_total", "Judge verdicts served from the judge cache."))
+judge_prefix_cache_total = registry.register(Counter(
+    "green_agent_judge_prefix_cache_total",
+    "Cached rubric prefixes created, refreshed, too small or unavailable for a model.", ("event",)))
+judge_cached_tokens_total = registry.register(Counter(
+    "green_agent_judge_cached_tokens_total", "Prompt tokens Gemini served from cached content.", ("model",)))
+
+# --- EXECUTION ---
+execution_seconds = registry.register(Histogram(
+    "green_agent_execution_seconds", "Running the original and the translation on every input.",
+    ("source_language", "target_language")))
+
+# --- A2A CLIENT ---
+send_message_seconds = registry.register(Histogram(
+    "green_agent_send_message_seconds", "Duration of send_message calls to other agents.", ("agent",)))
+card_resolution_seconds = registry.register(Histogram(
+    "green_agent_card_resolution_seconds", "Fetching an agent card (cache misses only).", ("agent",)))
+a2a_events_total = registry.register(Counter(
+    "green_agent_a2a_events_total", "A2A events received from other agents, by type.", ("event",)))
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Starlette handler serving the registry at /metrics."""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,122 @@
+import time
+from dataclasses import dataclass
+
+# Assumed latency (seconds) of a model that has not answered yet. Models that
+# are measurably faster than this are preferred; slower ones let untried
+# models have a go first.
+DEFAULT_LATENCY_PRIOR = 10.0
+# Weight of the newest sample in the latency moving average
+LATENCY_ALPHA = 0.3
+# Consecutive generic failures before a model's circuit opens
+FAILURE_THRESHOLD = 3
+# Cooldowns (seconds) applied when a circuit opens
+FAILURE_COOLDOWN = 30.0
+NOT_FOUND_COOLDOWN = 3600.0
+# Upper bound for the cooldown of a circuit that keeps re-opening
+MAX_COOLDOWN = 3600.0
+
+
+@dataclass
+class ModelStats:
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    latency: float | None = None
+    open_until: float = 0.0
+    trips: int = 0
+
+    @property
+    def success_rate(self) -> float:
+        # Laplace smoothing so a single result does not dominate
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+    def expected_cost(self) -> float:
+        latency = self.latency if self.latency is not None else DEFAULT_LATENCY_PRIOR
+        return latency / self.success_rate
+
+
+def error_status(error: Exception) -> int | None:
+    """Best-effort HTTP status of a failed model call."""
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code
+    message = str(error)
+    if "429" in message or "RESOURCE_EXHAUSTED" in message:
+        return 429
+    if "404" in message or "NOT_FOUND" in message:
+        return 404
+    return None
+
+
+class ModelRouter:
+    """Process-wide health tracker that orders judge models by expected cost.
+
+    Every attempt reports back through ``record_success``/``record_failure``.
+    A 404 opens the model's circuit immediately (deprecated), other errors
+    open it after ``FAILURE_THRESHOLD`` consecutive failures. Open circuits
+    are skipped until their cooldown expires, then the model is tried again;
+    each re-trip doubles the cooldown. Quota errors (429) are backed off by
+    the rate limiter alone: ``record_rate_limited`` only skips the model for
+    as long as the limiter blocks it.
+    """
+
+    def __init__(self, models: list[str]):
+        self._models = list(models)
+        self._stats = {model: ModelStats() for model in self._models}
+
+    def candidates(self) -> list[str]:
+        """Healthy models, cheapest (latency / success rate) first, ties in preference order."""
+        now = time.monotonic()
+        healthy = [model for model in self._models if self._stats[model].open_until <= now]
+        return sorted(healthy, key=lambda model: self._stats[model].expected_cost())
+
+    def next_available_in(self) -> float:
+        """Seconds until the first open circuit closes again (0 if a model is available)."""
+        now = time.monotonic()
+        return max(0.0, min(self._stats[model].open_until for model in self._models) - now)
+
+    def record_success(self, model: str, latency: float) -> None:
+        stats = self._stats[model]
+        stats.successes += 1
+        stats.consecutive_failures = 0
+        stats.trips = 0
+        stats.latency = latency if stats.latency is None else (
+            LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * stats.latency
+        )
+
+    def record_failure(self, model: str, error: Exception | None = None) -> None:
+        stats = self._stats[model]
+        stats.failures += 1
+        stats.consecutive_failures += 1
+        status = error_status(error) if error is not None else None
+        if status == 404:
+            self._open(stats, NOT_FOUND_COOLDOWN)
+        elif stats.consecutive_failures >= FAILURE_THRESHOLD:
+            self._open(stats, FAILURE_COOLDOWN)
+
+    def record_rate_limited(self, model: str, blocked_for: float) -> None:
+        """Skip ``model`` for the ``blocked_for`` seconds the rate limiter blocks it after a 429.
+
+        Not a failure: the model's success rate and circuit are left alone.
+        """
+        stats = self._stats[model]
+        stats.open_until = max(stats.open_until, time.monotonic() + blocked_for)
+
+    def _open(self, stats: ModelStats, cooldown: float) -> None:
+        cooldown = min(cooldown * 2 ** stats.trips, MAX_COOLDOWN)
+        stats.trips += 1
+        stats.consecutive_failures = 0
+        stats.open_until = time.monotonic() + cooldown
+
+    def snapshot(self) -> dict[str, dict]:
+        """Current per-model statistics, e.g. for debugging."""
+        now = time.monotonic()
+        return {
+            model: {
+                "successes": stats.successes,
+                "failures": stats.failures,
+                "latency": stats.latency,
+                "open_for": max(0.0, stats.open_until - now),
+            }
+            for model, stats in self._stats.items()
+        }
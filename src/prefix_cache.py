@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+
+from src import metrics
+
+logger = logging.getLogger(__name__)
+
+# Lifetime (seconds) of the Gemini cached content holding a prompt prefix. 0 disables
+# cached content; the prefix is then sent as a system instruction with every call.
+PREFIX_CACHE_TTL = int(os.environ.get("JUDGE_PREFIX_CACHE_TTL", "3600"))
+
+# A cached prefix is extended once less than this share of its lifetime is left
+REFRESH_FRACTION = 0.1
+
+# Seconds before asking again a model that could not cache the prefix (e.g. no caching support)
+RETRY_AFTER = 3600.0
+
+# Smallest prefix, in tokens, that Gemini caches explicitly; larger for the models not listed
+MIN_CACHE_TOKENS = {
+    "gemini-2.5-flash": 1024,
+    "gemini-2.5-flash-lite": 1024,
+    "gemini-flash-latest": 1024,
+    "gemini-flash-lite-latest": 1024,
+    "gemini-3-flash-preview": 1024,
+}
+DEFAULT_MIN_CACHE_TOKENS = 4096
+
+
+def min_cache_tokens(model: str) -> int:
+    return MIN_CACHE_TOKENS.get(model, DEFAULT_MIN_CACHE_TOKENS)
+
+
+class PromptPrefixCache:
+    """Gemini cached contents holding a static prompt prefix (the judge rubric), one per model.
+
+    A cached content is created on first use and shared by every judge in the
+    process, so calls only send what follows the prefix. It is extended before
+    it expires. Prefixes shorter than the model's minimum cache size are never
+    sent to ``caches.create``; for them, and for models that cannot cache the
+    prefix, the result is None and the caller sends the prefix as a system
+    instruction instead.
+    """
+
+    def __init__(self, ttl: int = PREFIX_CACHE_TTL):
+        self._ttl = ttl
+        # (model, prefix digest) -> (cached content name or None, monotonic time it is valid until)
+        self._entries: dict[tuple[str, str], tuple[str | None, float]] = {}
+        self._locks: dict[tuple[str, str], asyncio.Lock] = {}
+
+    @staticmethod
+    def _key(model: str, prefix: str) -> tuple[str, str]:
+        return model, hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+
+    async def get(self, client, model: str, prefix: str) -> str | None:
+        """Name of the cached content holding ``prefix`` for ``model``, or None if it cannot be cached."""
+        if self._ttl <= 0:
+            return None
+        key = self._key(model, prefix)
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            name, valid_until = self._entries.get(key, (None, 0.0))
+            now = time.monotonic()
+            if name is None and now < valid_until:
+                return None
+            if name is not None and valid_until - now > self._ttl * REFRESH_FRACTION:
+                return name
+
+            from google.genai import types
+
+            # --- REFRESH ---
+            if name is not None:
+                try:
+                    await client.aio.caches.update(name=name, config=types.UpdateCachedContentConfig(ttl=f"{self._ttl}s"))
+                    self._entries[key] = (name, now + self._ttl)
+                    metrics.judge_prefix_cache_total.inc(event="refreshed")
+                    return name
+                except Exception as e:
+                    logger.info("Could not extend cached prompt prefix %s, creating a new one: %s", name, e)
+
+            # --- SIZE CHECK ---
+            if key not in self._entries:
+                try:
+                    counted = await client.aio.models.count_tokens(model=model, contents=prefix)
+                except Exception as e:
+                    logger.info("Could not count the prompt prefix tokens for %s, sending it as a system "
+                                "instruction: %s", model, e)
+                    self._entries[key] = (None, now + RETRY_AFTER)
+                    metrics.judge_prefix_cache_total.inc(event="unavailable")
+                    return None
+                if (counted.total_tokens or 0) < min_cache_tokens(model):
+                    logger.debug("Prompt prefix of %s tokens is below the %d-token cache minimum of %s",
+                                 counted.total_tokens, min_cache_tokens(model), model)
+                    # The prefix is static, so it never becomes large enough
+                    self._entries[key] = (None, float("inf"))
+                    metrics.judge_prefix_cache_total.inc(event="too_small")
+                    return None
+
+            # --- CREATE ---
+            try:
+                cached = await client.aio.caches.create(model=model, config=types.CreateCachedContentConfig(
+                    system_instruction=prefix, ttl=f"{self._ttl}s", display_name="judge-prompt-prefix"
+                ))
+            except Exception as e:
+                logger.info("Could not cache the prompt prefix for %s, sending it as a system instruction: %s",
+                            model, e)
+                self._entries[key] = (None, now + RETRY_AFTER)
+                metrics.judge_prefix_cache_total.inc(event="unavailable")
+                return None
+            logger.debug("Cached prompt prefix for %s as %s", model, cached.name)
+            self._entries[key] = (cached.name, now + self._ttl)
+            metrics.judge_prefix_cache_total.inc(event="created")
+            return cached.name
+
+    def invalidate(self, model: str, prefix: str) -> None:
+        """Forget the cached content of ``prefix`` (e.g. after a call using it failed), so it is created again."""
+        self._entries.pop(self._key(model, prefix), None)
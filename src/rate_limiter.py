@@ -0,0 +1,249 @@
+import asyncio
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+
+# Per-model budgets, overridable through the environment. GEMINI_RATE_LIMITS
+# takes a JSON object of per-model overrides, e.g. {"gemini-2.5-pro": [5, 250000]}.
+DEFAULT_REQUESTS_PER_MINUTE = int(os.environ.get("GEMINI_RPM", "15"))
+DEFAULT_TOKENS_PER_MINUTE = int(os.environ.get("GEMINI_TPM", "250000"))
+MODEL_RATE_LIMITS = {
+    model: (int(rpm), int(tpm))
+    for model, (rpm, tpm) in json.loads(os.environ.get("GEMINI_RATE_LIMITS", "{}")).items()
+}
+
+# SQLite file holding the buckets when they are shared between server processes
+# (set by the server's --workers mode); empty keeps them in this process
+RATE_LIMIT_STATE_PATH = os.environ.get("RATE_LIMIT_STATE_PATH", "")
+
+# Jittered exponential backoff used when a 429 carries no retry delay
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 120.0
+# Tokens reserved for the model's answer on top of the prompt estimate
+RESPONSE_TOKEN_ESTIMATE = 512
+
+_RETRY_IN_PATTERN = re.compile(r"retry in ([\d.]+)s", re.IGNORECASE)
+_DURATION_PATTERN = re.compile(r"^([\d.]+)s$")
+
+
+def estimate_tokens(prompt: str) -> int:
+    """Rough token count (~4 characters per token) plus room for the answer."""
+    return len(prompt) // 4 + RESPONSE_TOKEN_ESTIMATE
+
+
+def retry_delay(error: Exception) -> float | None:
+    """Retry delay requested by the server in a 429 error, if any."""
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        for detail in details.get("error", {}).get("details", []) or []:
+            if isinstance(detail, dict) and detail.get("@type", "").endswith("google.rpc.RetryInfo"):
+                match = _DURATION_PATTERN.match(str(detail.get("retryDelay", "")))
+                if match:
+                    return float(match.group(1))
+    match = _RETRY_IN_PATTERN.search(str(error))
+    return float(match.group(1)) if match else None
+
+
+class TokenBucket:
+    """Bucket refilled continuously at ``per_minute / 60`` units per second."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def consume(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+
+@dataclass
+class _ModelBudget:
+    requests: TokenBucket
+    tokens: TokenBucket
+    blocked_until: float = 0.0
+    throttled: int = 0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class RateLimiter:
+    """Shared async limiter placed in front of every Gemini call.
+
+    Each model gets a requests-per-minute and a tokens-per-minute bucket.
+    ``acquire`` waits (FIFO per model) until both have room, so concurrent
+    evaluations in one process stay at the quota ceiling instead of all
+    getting throttled together. ``throttle`` blocks a model after a 429 for
+    the server-provided retry delay, or a jittered exponential backoff.
+    """
+
+    def __init__(self, requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = DEFAULT_TOKENS_PER_MINUTE,
+                 model_limits: dict[str, tuple[int, int]] | None = None):
+        self._requests_per_minute = requests_per_minute
+        self._tokens_per_minute = tokens_per_minute
+        self._model_limits = MODEL_RATE_LIMITS if model_limits is None else model_limits
+        self._budgets: dict[str, _ModelBudget] = {}
+
+    def _budget(self, model: str) -> _ModelBudget:
+        budget = self._budgets.get(model)
+        if budget is None:
+            rpm, tpm = self._model_limits.get(model, (self._requests_per_minute, self._tokens_per_minute))
+            budget = _ModelBudget(requests=TokenBucket(rpm), tokens=TokenBucket(tpm))
+            self._budgets[model] = budget
+        return budget
+
+    async def acquire(self, model: str, tokens: int) -> None:
+        budget = self._budget(model)
+        async with budget.lock:
+            while True:
+                now = time.monotonic()
+                wait = max(
+                    budget.blocked_until - now,
+                    budget.requests.wait_time(1, now),
+                    budget.tokens.wait_time(tokens, now),
+                )
+                if wait <= 0:
+                    budget.requests.consume(1, now)
+                    budget.tokens.consume(tokens, now)
+                    return
+                await asyncio.sleep(wait)
+
+    @staticmethod
+    def _backoff(throttled: int, delay: float | None) -> float:
+        if delay is None:
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (throttled - 1))
+            delay = random.uniform(delay / 2, delay)
+        return delay
+
+    async def throttle(self, model: str, delay: float | None = None) -> float:
+        """Block ``model`` after a 429 and return how long it stays blocked."""
+        budget = self._budget(model)
+        budget.throttled += 1
+        delay = self._backoff(budget.throttled, delay)
+        budget.blocked_until = max(budget.blocked_until, time.monotonic() + delay)
+        return delay
+
+    async def record_success(self, model: str) -> None:
+        self._budget(model).throttled = 0
+
+
+class SharedRateLimiter(RateLimiter):
+    """``RateLimiter`` whose buckets live in a SQLite file shared by several processes.
+
+    Each acquire refills and debits the model's buckets inside one
+    ``BEGIN IMMEDIATE`` transaction, so server workers draw from a single
+    quota instead of each assuming the whole of it. Wall-clock time is used
+    since monotonic clocks are not comparable between processes.
+    """
+
+    def __init__(self, path: str, requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = DEFAULT_TOKENS_PER_MINUTE,
+                 model_limits: dict[str, tuple[int, int]] | None = None):
+        super().__init__(requests_per_minute, tokens_per_minute, model_limits)
+        self._path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self._path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "model TEXT PRIMARY KEY, requests REAL NOT NULL, tokens REAL NOT NULL, updated REAL NOT NULL, "
+                "blocked_until REAL NOT NULL, throttled INTEGER NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _update(self, model: str, change) -> float:
+        """Run ``change(requests, tokens, state, now)`` on the stored buckets in one transaction."""
+        rpm, tpm = self._model_limits.get(model, (self._requests_per_minute, self._tokens_per_minute))
+        requests, tokens = TokenBucket(rpm), TokenBucket(tpm)
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = conn.execute(
+                    "SELECT requests, tokens, updated, blocked_until, throttled FROM rate_limits WHERE model = ?",
+                    (model,),
+                ).fetchone()
+                state = {"blocked_until": 0.0, "throttled": 0}
+                if row is None:
+                    requests.updated = tokens.updated = now
+                else:
+                    requests.level, tokens.level, updated, state["blocked_until"], state["throttled"] = row
+                    requests.updated = tokens.updated = updated
+                result = change(requests, tokens, state, now)
+                requests._refill(now)
+                tokens._refill(now)
+                conn.execute(
+                    "INSERT OR REPLACE INTO rate_limits (model, requests, tokens, updated, blocked_until, throttled) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (model, requests.level, tokens.level, now, state["blocked_until"], state["throttled"]),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return result
+
+    def _try_acquire(self, model: str, amount: int) -> float:
+        def change(requests: TokenBucket, tokens: TokenBucket, state: dict, now: float) -> float:
+            wait = max(state["blocked_until"] - now, requests.wait_time(1, now), tokens.wait_time(amount, now))
+            if wait <= 0:
+                requests.consume(1, now)
+                tokens.consume(amount, now)
+            return wait
+        return self._update(model, change)
+
+    async def acquire(self, model: str, tokens: int) -> None:
+        # The local lock keeps this process's callers in FIFO order
+        async with self._budget(model).lock:
+            while (wait := await asyncio.to_thread(self._try_acquire, model, tokens)) > 0:
+                await asyncio.sleep(wait)
+
+    def _throttle(self, model: str, delay: float | None) -> float:
+        def change(requests: TokenBucket, tokens: TokenBucket, state: dict, now: float) -> float:
+            state["throttled"] += 1
+            blocked_for = self._backoff(state["throttled"], delay)
+            state["blocked_until"] = max(state["blocked_until"], now + blocked_for)
+            return blocked_for
+        return self._update(model, change)
+
+    def _record_success(self, model: str) -> None:
+        # A plain read does not wait for writers in WAL mode; most calls stop here
+        with self._lock:
+            row = self._connect().execute("SELECT throttled FROM rate_limits WHERE model = ?", (model,)).fetchone()
+        if not row or not row[0]:
+            return
+
+        def change(requests: TokenBucket, tokens: TokenBucket, state: dict, now: float) -> None:
+            state["throttled"] = 0
+        self._update(model, change)
+
+    # The transactions may wait for other workers, so they run off the event loop like acquire's
+    async def throttle(self, model: str, delay: float | None = None) -> float:
+        return await asyncio.to_thread(self._throttle, model, delay)
+
+    async def record_success(self, model: str) -> None:
+        await asyncio.to_thread(self._record_success, model)
@@ -0,0 +1,322 @@
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import signal
+import sys
+import tempfile
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+
+from src import metrics
+from src.common import normalize_language
+
+# Limits applied to every run of a program, overridable through the environment
+EXECUTION_CPU_SECONDS = int(os.environ.get("EXECUTION_CPU_SECONDS", "5"))
+EXECUTION_MEMORY_MB = int(os.environ.get("EXECUTION_MEMORY_MB", "512"))
+EXECUTION_TIMEOUT = float(os.environ.get("EXECUTION_TIMEOUT", "10"))
+# Compilers get more time, but no memory limit (they fork helpers of their own)
+COMPILE_TIMEOUT = float(os.environ.get("EXECUTION_COMPILE_TIMEOUT", "60"))
+# Number of programs compiled or run at once across all evaluations in this process
+DEFAULT_EXECUTION_WORKERS = int(os.environ.get("EXECUTION_WORKERS", str(os.cpu_count() or 1)))
+
+# Largest file a program may write, and how much of its output is kept for comparison
+MAX_FILE_BYTES = 16 * 1024 * 1024
+MAX_OUTPUT_BYTES = 1024 * 1024
+# Total stdout of original programs kept for reuse; the least recently used go first
+MAX_CACHED_OUTPUT_BYTES = int(os.environ.get("EXECUTION_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+# How compilers and programs are isolated from the host: "unshare" runs them in
+# their own network (none), PID, IPC, UTS and mount namespaces as an unprivileged
+# uid; "none" relies on an outer disposable container instead
+EXECUTION_SANDBOX = os.environ.get("EXECUTION_SANDBOX", "unshare")
+SANDBOX_UID = 65534
+UNSHARE_COMMAND = ["unshare", "--net", "--pid", "--ipc", "--uts", "--mount", "--fork", "--kill-child",
+                   "--mount-proc"]
+
+# Per language: (file suffix, compile command or None, run command). "{file}",
+# "{dir}" and "{name}" are replaced by the source file, its directory and the
+# program name (the public class for Java).
+RUNNERS = {
+    "python": (".py", None, [sys.executable, "-I", "{file}"]),
+    "javascript": (".js", None, ["node", "{file}"]),
+    "ruby": (".rb", None, ["ruby", "{file}"]),
+    "bash": (".sh", None, ["bash", "{file}"]),
+    "php": (".php", None, ["php", "{file}"]),
+    "c": (".c", ["gcc", "-O1", "-o", "{dir}/main", "{file}", "-lm"], ["{dir}/main"]),
+    "cpp": (".cpp", ["g++", "-O1", "-o", "{dir}/main", "{file}"], ["{dir}/main"]),
+    "rust": (".rs", ["rustc", "-O", "-o", "{dir}/main", "{file}"], ["{dir}/main"]),
+    "go": (".go", ["go", "build", "-o", "{dir}/main", "{file}"], ["{dir}/main"]),
+    "java": (".java", ["javac", "-d", "{dir}", "{file}"], ["java", "-cp", "{dir}", "{name}"]),
+}
+
+_JAVA_CLASS_PATTERN = re.compile(r"public\s+(?:(?:final|abstract)\s+)*class\s+(\w+)")
+
+
+@dataclass
+class RunResult:
+    ok: bool
+    stdout: str
+    detail: str = ""
+
+
+@dataclass
+class ExecutionResult:
+    # None when the code could not be executed here, so the judge's score stands
+    score: float | None
+    details: str
+
+
+def _available(language: str) -> bool:
+    runner = RUNNERS.get(language)
+    if runner is None:
+        return False
+    _, compile_command, run_command = runner
+    tools = [run_command[0], "prlimit"] + ([compile_command[0]] if compile_command else [])
+    return all(tool.startswith("{dir}") or shutil.which(tool) for tool in tools)
+
+
+def program_name(code: str, language: str) -> str:
+    """Base name of the source file; for Java the public class, as javac requires."""
+    if language == "java":
+        match = _JAVA_CLASS_PATTERN.search(code)
+        return match.group(1) if match else "Main"
+    return "main"
+
+
+@contextmanager
+def source_directory(code: str, language: str, suffix: str) -> Iterator[tuple[str, str, str]]:
+    """Write ``code`` to a new temporary directory; yields ``(directory, source path, program name)``."""
+    with tempfile.TemporaryDirectory(prefix="green-agent-") as directory:
+        name = program_name(code, language)
+        path = os.path.join(directory, name + suffix)
+        with open(path, "w") as f:
+            f.write(code)
+        yield directory, path, name
+
+
+def expand_command(command: list[str], directory: str, path: str, name: str) -> list[str]:
+    """Replace the "{file}", "{dir}" and "{name}" placeholders of a tool's command."""
+    return [arg.replace("{file}", path).replace("{dir}", directory).replace("{name}", name) for arg in command]
+
+
+def sandbox_command() -> list[str] | None:
+    """Command prefix isolating a program, or None if programs cannot be isolated here."""
+    if EXECUTION_SANDBOX == "none":
+        return []
+    if EXECUTION_SANDBOX != "unshare" or not shutil.which("unshare") or not shutil.which("setpriv"):
+        return None
+    if os.geteuid() == 0:
+        # A real unprivileged uid on the host
+        return UNSHARE_COMMAND + ["--", "setpriv", f"--reuid={SANDBOX_UID}", f"--regid={SANDBOX_UID}",
+                                  "--clear-groups", "--"]
+    # Without privileges, a user namespace in which the program is not root
+    return UNSHARE_COMMAND + ["--user", f"--map-user={SANDBOX_UID}", f"--map-group={SANDBOX_UID}", "--"]
+
+
+def _limits_command() -> list[str]:
+    """prlimit prefix applying a program's CPU, memory, file-size and core limits.
+
+    prlimit sets them on itself before it execs the sandbox, whose processes
+    inherit them, so nothing runs between fork and exec in this multi-threaded
+    server process.
+    """
+    memory = EXECUTION_MEMORY_MB * 1024 * 1024
+    return [
+        "prlimit", f"--cpu={EXECUTION_CPU_SECONDS}:{EXECUTION_CPU_SECONDS + 1}",
+        # RLIMIT_DATA rather than RLIMIT_AS: runtimes such as V8 and the JVM reserve
+        # far more address space than they ever touch
+        f"--data={memory}:{memory}", f"--fsize={MAX_FILE_BYTES}:{MAX_FILE_BYTES}", "--core=0:0", "--",
+    ]
+
+
+def _normalize_output(output: str) -> str:
+    return "\n".join(line.rstrip() for line in output.strip().splitlines())
+
+
+async def _run(args: list[str], directory: str, stdin: str, timeout: float, limited: bool) -> RunResult:
+    env = {
+        "PATH": os.environ.get("PATH", ""),
+        "HOME": directory,
+        "TMPDIR": directory,
+        "LANG": "C.UTF-8",
+        # Per run, so one program cannot plant build results for another
+        "GOCACHE": os.path.join(directory, ".gocache"),
+    }
+    # Compilers and programs alike run isolated; only programs get resource limits
+    # (compilers fork helpers of their own)
+    process = await asyncio.create_subprocess_exec(
+        *(_limits_command() if limited else []), *sandbox_command(), *args,
+        cwd=directory,
+        env=env,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,
+    )
+
+    async def feed() -> None:
+        try:
+            process.stdin.write(stdin.encode())
+            await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        process.stdin.close()
+
+    async def read(stream: asyncio.StreamReader) -> bytes:
+        # Keep at most MAX_OUTPUT_BYTES but drain the pipe so the program is never blocked
+        data = bytearray()
+        while chunk := await stream.read(65536):
+            data.extend(chunk[:MAX_OUTPUT_BYTES - len(data)])
+        return bytes(data)
+
+    try:
+        _, stdout, stderr, returncode = await asyncio.wait_for(
+            asyncio.gather(feed(), read(process.stdout), read(process.stderr), process.wait()), timeout
+        )
+    except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        await process.wait()
+        if isinstance(e, asyncio.CancelledError):
+            # The evaluation was canceled: do not leave the program running
+            raise
+        return RunResult(ok=False, stdout="", detail=f"timed out after {timeout:g}s")
+
+    if returncode != 0:
+        # unshare reports a program killed by a signal with a message of its own and status 1
+        lines = [line for line in stderr.decode(errors="replace").strip().splitlines()
+                 if not line.startswith(("unshare:", "setpriv:", "prlimit:"))]
+        if returncode == -signal.SIGXCPU:
+            detail = f"exceeded the {EXECUTION_CPU_SECONDS}s CPU limit"
+        elif returncode == 1 and not lines and sandbox_command():
+            detail = f"was killed (the {EXECUTION_CPU_SECONDS}s CPU limit, the memory limit or a crash)"
+        else:
+            # Prefer the first line naming an error (compilers print context after it)
+            error = next((line for line in lines if "error" in line.lower()), lines[-1] if lines else "")
+            detail = f"exited with status {returncode}" + (f": {error.strip()[:200]}" if error else "")
+        return RunResult(ok=False, stdout="", detail=detail)
+    return RunResult(ok=True, stdout=stdout.decode(errors="replace"))
+
+
+class ExecutionPool:
+    """Bounded pool that compiles and runs code in isolated, resource-limited subprocesses.
+
+    At most ``workers`` compilers or programs run at once across every
+    evaluation sharing the pool, so parallel cases cannot oversubscribe the
+    host. Each run happens in namespaces of its own (see ``EXECUTION_SANDBOX``)
+    as an unprivileged uid without network access, with CPU-time, memory and
+    file-size rlimits, a wall-clock timeout, a scratch directory and an
+    environment without the server's secrets. Files on the host stay
+    readable wherever that uid may read them.
+
+    Outputs of the original programs are cached by source and input, so the
+    reference side is executed once per process no matter how many times a
+    case is re-run or how many translations are compared against it.
+    """
+
+    def __init__(self, workers: int = DEFAULT_EXECUTION_WORKERS):
+        self._slots = asyncio.Semaphore(workers)
+        self._original_outputs: OrderedDict[str, RunResult] = OrderedDict()
+        self._cached_output_bytes = 0
+
+    def _cache_original(self, key: str, result: RunResult) -> None:
+        if key in self._original_outputs:
+            return
+        self._original_outputs[key] = result
+        self._cached_output_bytes += len(result.stdout)
+        while self._cached_output_bytes > MAX_CACHED_OUTPUT_BYTES and len(self._original_outputs) > 1:
+            _, evicted = self._original_outputs.popitem(last=False)
+            self._cached_output_bytes -= len(evicted.stdout)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the pool's slots, e.g. to run another tool on the host."""
+        async with self._slots:
+            yield
+
+    async def _run_program(self, code: str, language: str, inputs: list[str]) -> list[RunResult]:
+        suffix, compile_command, run_command = RUNNERS[language]
+        with source_directory(code, language, suffix) as (directory, path, name):
+            if os.geteuid() == 0 and EXECUTION_SANDBOX != "none":
+                # Compiled and run in here by the sandbox uid
+                os.chown(directory, SANDBOX_UID, SANDBOX_UID)
+
+            def expand(command: list[str]) -> list[str]:
+                return expand_command(command, directory, path, name)
+
+            if compile_command:
+                async with self._slots:
+                    compiled = await _run(expand(compile_command), directory, "", COMPILE_TIMEOUT, limited=False)
+                if not compiled.ok:
+                    return [RunResult(ok=False, stdout="", detail=f"compilation {compiled.detail}")] * len(inputs)
+
+            results = []
+            for stdin in inputs:
+                async with self._slots:
+                    results.append(await _run(expand(run_command), directory, stdin, EXECUTION_TIMEOUT, limited=True))
+            return results
+
+    async def _original_results(self, code: str, language: str, inputs: list[str]) -> list[RunResult]:
+        keys = [hashlib.sha256(f"{language}\0{code}\0{stdin}".encode()).hexdigest() for stdin in inputs]
+        results = {key: self._original_outputs.get(key) for key in keys}
+        missing = [(key, stdin) for key, stdin in zip(keys, inputs) if results[key] is None]
+        if missing:
+            ran = await self._run_program(code, language, [stdin for _, stdin in missing])
+            for (key, _), result in zip(missing, ran):
+                results[key] = result
+                self._cache_original(key, result)
+        for key in keys:
+            if key in self._original_outputs:
+                self._original_outputs.move_to_end(key)
+        return [results[key] for key in keys]
+
+    async def compare(self, code_to_translate: str, source_language: str, translated_code: str,
+                      target_language: str, inputs: list[str]) -> ExecutionResult:
+        """Run both versions on every stdin in ``inputs`` and score matching outputs 0-10."""
+        source_language = normalize_language(source_language)
+        target_language = normalize_language(target_language)
+        if sandbox_command() is None:
+            return ExecutionResult(score=None, details=f"no execution sandbox available ({EXECUTION_SANDBOX})")
+        for language in (source_language, target_language):
+            if not _available(language):
+                return ExecutionResult(score=None, details=f"no {language} toolchain available for execution")
+        inputs = inputs or [""]
+
+        with metrics.execution_seconds.time(source_language=source_language, target_language=target_language):
+            original, translated = await asyncio.gather(
+                self._original_results(code_to_translate, source_language, inputs),
+                self._run_program(translated_code, target_language, inputs),
+            )
+
+        compared = matched = 0
+        notes = []
+        for n, (expected, actual) in enumerate(zip(original, translated), start=1):
+            if not expected.ok:
+                # Nothing to compare against when the original itself fails
+                notes.append(f"input {n}: original {expected.detail}")
+                continue
+            compared += 1
+            if not actual.ok:
+                notes.append(f"input {n}: translation {actual.detail}")
+            elif _normalize_output(actual.stdout) == _normalize_output(expected.stdout):
+                matched += 1
+            else:
+                notes.append(f"input {n}: outputs differ")
+
+        if compared == 0:
+            return ExecutionResult(score=None, details="; ".join(notes))
+        summary = f"{matched}/{compared} inputs produced the original output"
+        return ExecutionResult(
+            score=round(10 * matched / compared, 2),
+            details=summary + (f" ({'; '.join(notes)})" if notes else ""),
+        )
+
+
+# Shared by every evaluation in this process, and by the local judge's syntax checks
+execution_pool = ExecutionPool()
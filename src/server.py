@@ -1,57 +1,177 @@
 import argparse
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
 import uvicorn
 from dotenv import load_dotenv
 from starlette.applications import Starlette
-from google.adk.a2a.utils.agent_to_a2a import (
-    A2AStarletteApplication,
-    DefaultRequestHandler,
-    InMemoryTaskStore,
-)
+from a2a.server.apps import A2AStarletteApplication
+from a2a.server.request_handlers import DefaultRequestHandler
 
-from src.agent import TranslationGreenAgent
+from src.agent import JUDGE_BACKENDS, TranslationGreenAgent
 from src.tool_provider import ToolProvider
 from src.common import translator_judge_agent_card
 from src.executor import GreenExecutor
+from src.logging_setup import configure_logging, stop_logging
+from src.metrics import metrics_endpoint
+from src.task_store import SqliteTaskStore
+from src.translation_store import TranslationStore
+from src.tracing import configure_tracing, shutdown_tracing
 
 load_dotenv()
 
-def main():
-    parser = argparse.ArgumentParser(description="Run the Green Agent Server")
-    parser.add_argument("--host", type=str, default="127.0.0.1", help="Host to bind")
-    parser.add_argument("--port", type=int, default=9009, help="Port to bind")
-    parser.add_argument("--card-url", type=str, help="Agent Card URL")
-    args = parser.parse_args()
+# Server settings handed to every worker process (uvicorn starts workers from an
+# import string, so they cannot receive objects or parsed arguments)
+JUDGE_ENV = "GREEN_AGENT_JUDGE"
+CARD_URL_ENV = "GREEN_AGENT_CARD_URL"
+ALLOW_EXECUTION_ENV = "GREEN_AGENT_ALLOW_EXECUTION"
+
+# Slowest imports listed by --profile-startup
+PROFILE_TOP_IMPORTS = 10
+
+
+def preload_gemini_sdk() -> None:
+    """Import the Gemini SDK in the background once the server is up, so the first judged case does not wait."""
+    threading.Thread(target=importlib.import_module, args=("google.genai",), name="preload-gemini-sdk",
+                     daemon=True).start()
+
+
+def create_app(single_worker: bool = False) -> Starlette:
+    """Build the A2A application; called once per server worker.
+
+    A ``single_worker`` owns the task store alone, so the tasks still running
+    when it last stopped are failed.
+    """
+    configure_logging()
+    configure_tracing()
 
     # Initialize the logic
     tool_provider = ToolProvider()
+
+    # Tasks and per-case checkpoints survive restarts in a local SQLite file
+    task_store = SqliteTaskStore()
+    if single_worker:
+        task_store.fail_interrupted()
+    translation_store = TranslationStore()
     
     # Create the TranslationGreenAgent, which internally creates the judge agent
-    translation_green_agent = TranslationGreenAgent(tool_provider)
+    translation_green_agent = TranslationGreenAgent(
+        tool_provider, judge=os.environ.get(JUDGE_ENV, "gemini"), task_store=task_store,
+        translation_store=translation_store, allow_execution=os.environ.get(ALLOW_EXECUTION_ENV) == "1"
+    )
     
     # Wrap the TranslationGreenAgent with GreenExecutor
-    executor = GreenExecutor(translation_green_agent)
+    executor = GreenExecutor(translation_green_agent, task_store=task_store)
 
     # Create the Agent Card (this refers to the overall green agent, not just the judge)
-    card_url = args.card_url if args.card_url else f"http://{args.host}:{args.port}/"
     card = translator_judge_agent_card(
         name="TranslatorGreenAgent", # Updated name to reflect the overall agent
-        url=card_url
+        url=os.environ.get(CARD_URL_ENV, "http://127.0.0.1:9009/")
     )
 
     # Manually create the A2A components
-    task_store = InMemoryTaskStore()
     handler = DefaultRequestHandler(executor, task_store)
     
     # Create the A2A Application helper
     a2a_app = A2AStarletteApplication(agent_card=card, http_handler=handler)
     
-    # Create the actual Starlette application
-    app = Starlette()
+    # Create the actual Starlette application, closing pooled agent connections and the stores
+    # and flushing logs and spans on shutdown. The Gemini SDK is only loaded after startup.
+    app = Starlette(on_startup=[preload_gemini_sdk] if os.environ.get(JUDGE_ENV, "gemini") == "gemini" else [],
+                    on_shutdown=[tool_provider.aclose, task_store.close, translation_store.close, shutdown_tracing, stop_logging])
     
-    # Add A2A routes to the Starlette app
+    # Add A2A routes to the Starlette app, plus Prometheus metrics
     a2a_app.add_routes_to_app(app)
-    
-    uvicorn.run(app, host=args.host, port=args.port)
+    app.add_route("/metrics", metrics_endpoint, methods=["GET"])
+    return app
+
+
+def import_times(module: str) -> tuple[float, list[tuple[float, str]]]:
+    """Seconds a fresh interpreter takes to import ``module``, and those of its direct imports, slowest first."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    # Lines are "import time: self [us] | cumulative | <indented name>", children before their parent
+    children = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        depth = len(name) - len(name.lstrip())
+        if depth == 1:
+            if name.strip() == module:
+                return int(cumulative) / 1e6, sorted(children, reverse=True)
+            children = []
+        elif depth == 3:
+            children.append((int(cumulative) / 1e6, name.strip()))
+    return 0.0, []
+
+
+def profile_startup(budget: float | None) -> int:
+    """Print how long importing the server and building the app take; non-zero if over ``budget`` seconds."""
+    import_seconds, children = import_times(__spec__.name if __spec__ else "src.server")
+    started = time.perf_counter()
+    create_app()
+    app_seconds = time.perf_counter() - started
+    total = import_seconds + app_seconds
+
+    print(f"{'import src.server':<40} {import_seconds:>7.3f}s")
+    for seconds, name in children[:PROFILE_TOP_IMPORTS]:
+        print(f"  {name:<38} {seconds:>7.3f}s")
+    print(f"{'create_app()':<40} {app_seconds:>7.3f}s")
+    print(f"{'total':<40} {total:>7.3f}s" + (f" (budget {budget:.3f}s)" if budget is not None else ""))
+    if budget is not None and total > budget:
+        print(f"Startup exceeds the budget by {total - budget:.3f}s", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Green Agent Server")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Host to bind")
+    parser.add_argument("--port", type=int, default=9009, help="Port to bind")
+    parser.add_argument("--card-url", type=str, help="Agent Card URL")
+    parser.add_argument("--judge", type=str, choices=sorted(JUDGE_BACKENDS), default="gemini",
+                        help="Default judge backend (requests may override it with 'judge' in their config)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of server processes sharing the port")
+    parser.add_argument("--allow-execution", action="store_true",
+                        help="Accept requests with 'execute', which compile and run submitted code on this host")
+    parser.add_argument("--log-level", type=str, choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="Log level of the agent's loggers (default: LOG_LEVEL or INFO)")
+    parser.add_argument("--trace-file", type=str,
+                        help="Write OpenTelemetry spans to this file as JSON lines (default: TRACE_FILE)")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print the server's import and app construction times, then exit")
+    parser.add_argument("--startup-budget", type=float,
+                        help="With --profile-startup, exit with status 1 if startup takes longer (seconds)")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    os.environ[JUDGE_ENV] = args.judge
+    os.environ[ALLOW_EXECUTION_ENV] = "1" if args.allow_execution else "0"
+    if args.log_level:
+        os.environ["LOG_LEVEL"] = args.log_level
+    if args.trace_file:
+        os.environ["TRACE_FILE"] = args.trace_file
+    os.environ[CARD_URL_ENV] = args.card_url if args.card_url else f"http://{args.host}:{args.port}/"
+
+    if args.profile_startup:
+        sys.exit(profile_startup(args.startup_budget))
+
+    if args.workers == 1:
+        uvicorn.run(create_app(single_worker=True), host=args.host, port=args.port)
+        return
+
+    # Workers share tasks and judge verdicts through their SQLite files already;
+    # Gemini quotas are shared by moving the rate limiter's buckets there too
+    os.environ.setdefault("RATE_LIMIT_STATE_PATH", ".cache/rate_limits.sqlite3")
+    uvicorn.run("src.server:create_app", factory=True, host=args.host, port=args.port, workers=args.workers)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
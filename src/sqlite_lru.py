@@ -0,0 +1,86 @@
+import os
+import sqlite3
+import threading
+import time
+
+# Seconds a statement waits for another server worker's write to finish before it fails
+SQLITE_BUSY_TIMEOUT = float(os.environ.get("SQLITE_BUSY_TIMEOUT", "30"))
+
+
+class SqliteLRU:
+    """Size-bounded LRU table of text values in a local SQLite file (WAL mode).
+
+    Each entry has a key, a label saying what produced it (shown to people
+    inspecting the file) and its value. Once more than ``max_entries`` are
+    stored, the least recently used ones are evicted. Methods are blocking
+    and thread-safe; callers run them through ``asyncio.to_thread`` and
+    handle ``sqlite3.Error``.
+    """
+
+    def __init__(self, path: str, table: str, max_entries: int):
+        self._path = path
+        self._table = table
+        self._max_entries = max_entries
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self._path, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self._table} ("
+                "key TEXT PRIMARY KEY, label TEXT NOT NULL, value TEXT NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self._table}_last_access ON {self._table} (last_access)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys: list[str]) -> dict[str, str]:
+        """Values stored under any of ``keys``; they are not marked as used (see ``touch``)."""
+        with self._lock:
+            placeholders = ",".join("?" * len(keys))
+            rows = self._connect().execute(
+                f"SELECT key, value FROM {self._table} WHERE key IN ({placeholders})", keys
+            ).fetchall()
+        return dict(rows)
+
+    def touch(self, key: str) -> None:
+        """Mark ``key`` as just used, so it is evicted last."""
+        with self._lock, self._connect() as conn:
+            conn.execute(f"UPDATE {self._table} SET last_access = ? WHERE key = ?", (time.time(), key))
+
+    def get(self, key: str) -> str | None:
+        value = self.get_many([key]).get(key)
+        if value is not None:
+            self.touch(key)
+        return value
+
+    def put(self, key: str, label: str, value: str) -> None:
+        # The connection commits, or rolls back if a statement fails
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self._table} (key, label, value, last_access) VALUES (?, ?, ?, ?)",
+                (key, label, value, time.time()),
+            )
+            (count,) = conn.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()
+            if count > self._max_entries:
+                conn.execute(
+                    f"DELETE FROM {self._table} WHERE key IN "
+                    f"(SELECT key FROM {self._table} ORDER BY last_access LIMIT ?)",
+                    (count - self._max_entries,),
+                )
+
+    def delete(self, key: str) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute(f"DELETE FROM {self._table} WHERE key = ?", (key,))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,228 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from a2a.server.context import ServerCallContext
+from a2a.server.tasks import TaskStore
+from a2a.types import Task, TaskState, TaskStatus
+from a2a.utils import new_agent_text_message
+from pydantic import ValidationError
+
+from src.common import TranslatorEval
+from src.sqlite_lru import SQLITE_BUSY_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# Location of the task database and how long (seconds) an untouched task is kept,
+# overridable through the environment
+DEFAULT_TASK_STORE_PATH = os.environ.get("TASK_STORE_PATH", ".cache/tasks.sqlite3")
+DEFAULT_TASK_TTL = float(os.environ.get("TASK_STORE_TTL", str(7 * 24 * 3600)))
+# Minimum seconds between two sweeps for expired tasks
+EXPIRY_INTERVAL = 60.0
+
+
+class SqliteTaskStore(TaskStore):
+    """A2A task store persisted in a local SQLite file (WAL mode).
+
+    Besides the A2A ``Task`` objects it keeps a checkpoint of every judged
+    case, so an evaluation interrupted by a crash or restart can be resumed
+    (see ``resume_task_id``), or a later run can reuse the unchanged cases
+    (see ``previous_task_id``), without translating and judging them again.
+    It also relays cancel requests between server workers. Tasks
+    and checkpoints not updated for ``ttl`` seconds are deleted, which keeps
+    the file from growing without bound.
+    """
+
+    def __init__(self, path: str = DEFAULT_TASK_STORE_PATH, ttl: float = DEFAULT_TASK_TTL):
+        self._path = path
+        self._ttl = ttl
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._last_expiry = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self._path, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tasks (id TEXT PRIMARY KEY, task TEXT NOT NULL, updated REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                "task_id TEXT NOT NULL, case_index INTEGER NOT NULL, fingerprint TEXT NOT NULL, "
+                "evaluations TEXT NOT NULL, updated REAL NOT NULL, failed INTEGER NOT NULL DEFAULT 0, "
+                "PRIMARY KEY (task_id, case_index))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cancel_requests (task_id TEXT PRIMARY KEY, updated REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS tasks_updated ON tasks (updated)")
+            conn.execute("CREATE INDEX IF NOT EXISTS checkpoints_updated ON checkpoints (updated)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _expire(self, conn: sqlite3.Connection, now: float) -> None:
+        if now - self._last_expiry < EXPIRY_INTERVAL:
+            return
+        self._last_expiry = now
+        cutoff = now - self._ttl
+        conn.execute("DELETE FROM tasks WHERE updated < ?", (cutoff,))
+        conn.execute("DELETE FROM checkpoints WHERE updated < ?", (cutoff,))
+        conn.execute("DELETE FROM cancel_requests WHERE updated < ?", (cutoff,))
+
+    def _save(self, task: Task) -> None:
+        # The connection commits, or rolls back if a statement fails
+        with self._lock, self._connect() as conn:
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO tasks (id, task, updated) VALUES (?, ?, ?)",
+                (task.id, task.model_dump_json(), now),
+            )
+            self._expire(conn, now)
+
+    def _get(self, task_id: str) -> Task | None:
+        with self._lock:
+            row = self._connect().execute("SELECT task FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        if row is None:
+            return None
+        try:
+            return Task.model_validate_json(row[0])
+        except ValidationError:
+            return None
+
+    def _delete(self, task_id: str) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+            conn.execute("DELETE FROM checkpoints WHERE task_id = ?", (task_id,))
+            conn.execute("DELETE FROM cancel_requests WHERE task_id = ?", (task_id,))
+
+    def _request_cancel(self, task_id: str) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cancel_requests (task_id, updated) VALUES (?, ?)", (task_id, time.time())
+            )
+
+    def _cancel_requested(self, task_id: str) -> bool:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT 1 FROM cancel_requests WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        return row is not None
+
+    def _save_checkpoint(self, task_id: str, case_index: int, fingerprint: str,
+                         evaluations: dict[str, TranslatorEval], failed: bool) -> None:
+        data = json.dumps({role: evaluation.model_dump() for role, evaluation in evaluations.items()})
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (task_id, case_index, fingerprint, evaluations, updated, failed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (task_id, case_index, fingerprint, data, time.time(), int(failed)),
+            )
+
+    def _load_checkpoints(self, task_id: str) -> dict[int, tuple[str, dict[str, TranslatorEval], bool]]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT case_index, fingerprint, evaluations, failed FROM checkpoints WHERE task_id = ?", (task_id,)
+            ).fetchall()
+        checkpoints = {}
+        for case_index, fingerprint, data, failed in rows:
+            try:
+                evaluations = {role: TranslatorEval.model_validate(e) for role, e in json.loads(data).items()}
+            except (ValueError, ValidationError):
+                continue
+            checkpoints[case_index] = (fingerprint, evaluations, bool(failed))
+        return checkpoints
+
+    def fail_interrupted(self) -> None:
+        """Mark the tasks a previous server run left submitted or working as failed.
+
+        Call it at startup, and only when no other server worker shares the file:
+        the tasks that worker is running would look interrupted too. The failure
+        message names ``resume_task_id``, which reuses the task's checkpoints.
+        """
+        try:
+            with self._lock, self._connect() as conn:
+                rows = conn.execute(
+                    "SELECT task FROM tasks WHERE json_extract(task, '$.status.state') IN ('submitted', 'working')"
+                ).fetchall()
+                now = time.time()
+                for (data,) in rows:
+                    try:
+                        task = Task.model_validate_json(data)
+                    except ValidationError:
+                        continue
+                    task.status = TaskStatus(
+                        state=TaskState.failed,
+                        message=new_agent_text_message(
+                            f"Interrupted by a server restart. Send the request again with "
+                            f"'resume_task_id': '{task.id}' to finish it.",
+                            task.context_id, task.id
+                        ),
+                        timestamp=datetime.now(timezone.utc).isoformat()
+                    )
+                    conn.execute("UPDATE tasks SET task = ?, updated = ? WHERE id = ?",
+                                 (task.model_dump_json(), now, task.id))
+        except sqlite3.Error as e:
+            logger.warning("Task store could not fail the interrupted tasks: %s", e)
+            return
+        if rows:
+            logger.warning("Marked %d task(s) interrupted by the last shutdown as failed", len(rows))
+
+    @staticmethod
+    async def _call(action: str, function, *args, default=None):
+        """Run ``function`` in a thread; on a SQLite error, log it and return ``default``.
+
+        A file locked by another worker for longer than the busy timeout must
+        not fail the evaluation.
+        """
+        try:
+            return await asyncio.to_thread(function, *args)
+        except sqlite3.Error as e:
+            logger.warning("Task store could not %s: %s", action, e)
+            return default
+
+    async def save(self, task: Task, context: ServerCallContext | None = None) -> None:
+        await self._call(f"save task {task.id}", self._save, task)
+
+    async def get(self, task_id: str, context: ServerCallContext | None = None) -> Task | None:
+        return await self._call(f"read task {task_id}", self._get, task_id)
+
+    async def delete(self, task_id: str, context: ServerCallContext | None = None) -> None:
+        await self._call(f"delete task {task_id}", self._delete, task_id)
+
+    async def save_checkpoint(self, task_id: str, case_index: int, fingerprint: str,
+                              evaluations: dict[str, TranslatorEval], failed: bool = False) -> None:
+        """Record the finished evaluations (by participant role) of case ``case_index`` of ``task_id``.
+
+        ``failed`` marks a case whose translation or judging failed, so later runs redo it.
+        """
+        await self._call(f"checkpoint case {case_index} of task {task_id}", self._save_checkpoint,
+                         task_id, case_index, fingerprint, evaluations, failed)
+
+    async def load_checkpoints(self, task_id: str) -> dict[int, tuple[str, dict[str, TranslatorEval], bool]]:
+        """Return ``{case_index: (fingerprint, evaluations, failed)}`` for the cases ``task_id`` finished."""
+        return await self._call(f"load the checkpoints of task {task_id}", self._load_checkpoints, task_id,
+                                default={})
+
+    async def request_cancel(self, task_id: str) -> None:
+        """Ask whichever server worker runs ``task_id`` to cancel it."""
+        await self._call(f"relay the cancel request of task {task_id}", self._request_cancel, task_id)
+
+    async def cancel_requested(self, task_id: str) -> bool:
+        return await self._call(f"check for a cancel request of task {task_id}", self._cancel_requested, task_id,
+                                default=False)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -1,8 +1,21 @@
-from src.client import send_message
+from src import tracing
+from src.client import ClientPool, send_message
 
 class ToolProvider:
     def __init__(self):
         self._context_ids = {}
+        # Connections and agent cards are reused across every message sent
+        self._client_pool = ClientPool()
+
+    async def send_to_agent(self, message: str | dict, url: str, new_conversation: bool = False) -> dict:
+        """Like ``talk_to_agent``, but returns every output of ``send_message``, including the
+        structured ``data`` payloads of the response. A ``dict`` message is sent as a DataPart
+        if the agent's card accepts ``application/json``."""
+        with tracing.span("talk_to_agent", agent=url, new_conversation=new_conversation):
+            outputs = await send_message(message=message, base_url=url, context_id=None if new_conversation else self._context_ids.get(url, None),
+                                         pool=self._client_pool)
+        self._context_ids[url] = outputs.get("context_id", None)
+        return outputs
 
     async def talk_to_agent(self, message: str, url: str, new_conversation: bool = False):
         """
@@ -16,12 +29,19 @@ class ToolProvider:
         Returns:
             str: The agent's response message
         """
-        outputs = await send_message(message=message, base_url=url, context_id=None if new_conversation else self._context_ids.get(url, None))
+        outputs = await self.send_to_agent(message, url, new_conversation)
         if outputs.get("status", "completed") != "completed" and "response" not in outputs:
              # Simple check, strictly speaking we might want to check status if available
              pass
-        self._context_ids[url] = outputs.get("context_id", None)
         return outputs["response"]
 
+    async def get_agent_card(self, url: str):
+        """The agent's card, cached with the pooled connections."""
+        return await self._client_pool.get_agent_card(url)
+
     def reset(self):
-        self._context_ids = {}
\ No newline at end of file
+        self._context_ids = {}
+
+    async def aclose(self):
+        """Close the pooled connections to other agents."""
+        await self._client_pool.aclose()
\ No newline at end of file
@@ -0,0 +1,164 @@
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    from opentelemetry import propagate, trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+except ImportError:  # tracing is optional; spans become no-ops without OpenTelemetry
+    trace = None
+
+logger = logging.getLogger(__name__)
+
+# Spans are exported as JSON lines to TRACE_FILE and/or over OTLP/HTTP to
+# OTEL_EXPORTER_OTLP_ENDPOINT; with neither set, tracing stays off
+SERVICE_NAME = "code-translator-green-agent"
+
+_tracer = None
+_provider = None
+
+
+class _NoopSpan:
+    """Stand-in used when tracing is off or OpenTelemetry is not installed."""
+
+    def set_attribute(self, key, value) -> None:
+        pass
+
+    def set_attributes(self, attributes) -> None:
+        pass
+
+    def add_event(self, name, attributes=None) -> None:
+        pass
+
+    def add_link(self, context, attributes=None) -> None:
+        pass
+
+    def get_span_context(self):
+        return None
+
+    def end(self) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+if trace is not None:
+    class FileSpanExporter(SpanExporter):
+        """Append finished spans to a file, one JSON object per line."""
+
+        def __init__(self, path: str):
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+            self._lock = threading.Lock()
+
+        def export(self, spans) -> "SpanExportResult":
+            with self._lock:
+                for span in spans:
+                    self._file.write(span.to_json(indent=None) + "\n")
+                self._file.flush()
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self) -> None:
+            with self._lock:
+                self._file.close()
+
+
+def configure_tracing(trace_file: str | None = None) -> bool:
+    """Start exporting spans; returns False when no exporter is configured or available."""
+    global _tracer, _provider
+    trace_file = trace_file or os.environ.get("TRACE_FILE")
+    otlp_endpoint = os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT")
+    if not (trace_file or otlp_endpoint):
+        return False
+    if trace is None:
+        logger.warning("Tracing requested but OpenTelemetry is not installed")
+        return False
+
+    shutdown_tracing()
+    provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME, "process.pid": os.getpid()}))
+    if trace_file:
+        # Batched, so spans are written by the processor's thread rather than the event loop
+        provider.add_span_processor(BatchSpanProcessor(FileSpanExporter(trace_file)))
+    if otlp_endpoint:
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning("OTEL_EXPORTER_OTLP_ENDPOINT is set but the OTLP exporter is not installed")
+        else:
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    # A private provider, so libraries that configure the global one are unaffected
+    _provider = provider
+    _tracer = provider.get_tracer("src")
+    return True
+
+
+def shutdown_tracing() -> None:
+    """Flush pending spans and stop exporting."""
+    global _tracer, _provider
+    if _provider is not None:
+        _provider.shutdown()
+    _provider = None
+    _tracer = None
+
+
+@contextmanager
+def span(name: str, context=None, parent=None, links=(), **attributes):
+    """Run the enclosed block in a span.
+
+    The span is a child of the current span, of ``parent`` (a span from
+    ``start_span``) or of an extracted ``context``; ``links`` are spans it
+    relates to without being their child, e.g. the cases of a judge batch.
+    """
+    if _tracer is None:
+        yield _NOOP_SPAN
+        return
+    if parent is not None and parent is not _NOOP_SPAN:
+        context = trace.set_span_in_context(parent)
+    link_objects = [trace.Link(link.get_span_context()) for link in links if link is not _NOOP_SPAN]
+    with _tracer.start_as_current_span(name, context=context, links=link_objects,
+                                       attributes=_clean(attributes)) as current:
+        yield current
+
+
+def start_span(name: str, **attributes):
+    """Start a span that outlives a single block; end it with ``span.end()``."""
+    if _tracer is None:
+        return _NOOP_SPAN
+    return _tracer.start_span(name, attributes=_clean(attributes))
+
+
+@contextmanager
+def use_span(current):
+    """Make a span from ``start_span`` the parent of the spans started in the enclosed block."""
+    if _tracer is None or current is _NOOP_SPAN:
+        yield current
+        return
+    with trace.use_span(current, end_on_exit=False):
+        yield current
+
+
+def inject_context() -> dict[str, str]:
+    """W3C trace context (``traceparent``) of the current span, for outgoing message metadata."""
+    carrier: dict[str, str] = {}
+    if _tracer is not None:
+        propagate.inject(carrier)
+    return carrier
+
+
+def extract_context(carrier: dict | None):
+    """Trace context sent by the caller in message metadata, if any."""
+    if _tracer is None or not carrier:
+        return None
+    return propagate.extract({key: value for key, value in carrier.items() if isinstance(value, str)})
+
+
+def _clean(attributes: dict) -> dict:
+    # OpenTelemetry attributes must be primitives (or sequences of them)
+    return {key: value if isinstance(value, (str, bool, int, float)) else str(value)
+            for key, value in attributes.items() if value is not None}
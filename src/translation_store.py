@@ -0,0 +1,61 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+
+from src.common import normalize_language
+from src.sqlite_lru import SqliteLRU
+
+logger = logging.getLogger(__name__)
+
+# Location and size of the on-disk store
+DEFAULT_TRANSLATION_STORE_PATH = os.environ.get("TRANSLATION_STORE_PATH", ".cache/translations.sqlite3")
+DEFAULT_TRANSLATION_STORE_MAX_ENTRIES = int(os.environ.get("TRANSLATION_STORE_MAX_ENTRIES", "50000"))
+
+
+class TranslationStore:
+    """Persistent, size-bounded LRU store of participant translations.
+
+    Entries are keyed by a SHA-256 of the participant's agent card name and
+    version, the (normalized) language pair and the source code, so a
+    translation is replayed only for the same release of the same agent.
+    Once more than ``max_entries`` translations are stored, the least
+    recently used ones are evicted.
+    """
+
+    def __init__(self, path: str = DEFAULT_TRANSLATION_STORE_PATH,
+                 max_entries: int = DEFAULT_TRANSLATION_STORE_MAX_ENTRIES):
+        self._table = SqliteLRU(path, "translations", max_entries)
+
+    @staticmethod
+    def make_key(agent_name: str, agent_version: str, source_language: str, target_language: str,
+                 code_to_translate: str) -> str:
+        digest = hashlib.sha256()
+        for field in (agent_name, agent_version, normalize_language(source_language),
+                      normalize_language(target_language)):
+            digest.update(field.encode("utf-8"))
+            digest.update(b"\0")
+        digest.update(hashlib.sha256(code_to_translate.encode("utf-8")).digest())
+        return digest.hexdigest()
+
+    async def get(self, agent_name: str, agent_version: str, source_language: str, target_language: str,
+                  code_to_translate: str) -> str | None:
+        """Return the stored translation of ``code_to_translate`` by this agent release, if any."""
+        key = self.make_key(agent_name, agent_version, source_language, target_language, code_to_translate)
+        try:
+            return await asyncio.to_thread(self._table.get, key)
+        except sqlite3.Error as e:
+            logger.warning("Translation store lookup failed, asking the participant: %s", e)
+            return None
+
+    async def put(self, agent_name: str, agent_version: str, source_language: str, target_language: str,
+                  code_to_translate: str, translated_code: str) -> None:
+        key = self.make_key(agent_name, agent_version, source_language, target_language, code_to_translate)
+        try:
+            await asyncio.to_thread(self._table.put, key, f"{agent_name}@{agent_version}", translated_code)
+        except sqlite3.Error as e:
+            logger.warning("Could not store a translation: %s", e)
+
+    def close(self) -> None:
+        self._table.close()
@@ -0,0 +1,364 @@
+"""Throughput benchmark of the green agent against in-process fakes.
+
+Runs the real green agent (A2A server, pipeline, client pool, Gemini judge
+code path) against a fake purple agent served in the same process and a fake
+``genai`` client, so results are reproducible without network access or an
+API key. Latency and failure rates of both fakes are configurable.
+
+Every suite (number of cases x concurrency) runs in a fresh process, and the
+results are written to a JSON file named after the current commit so runs can
+be compared across commits:
+
+    python tests/run_benchmark.py --cases 1,10,100 --concurrency 1,8
+    python tests/run_benchmark.py --baseline benchmark_results/<commit>.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from uuid import uuid4
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RESULTS_DIR = os.path.join(ROOT, "benchmark_results")
+PROCESSING_STATUS = re.compile(r"Processing Case (\d+)/")
+
+
+# --- FAKE PURPLE AGENT ---
+
+def build_purple_app(port: int, latency: float, failure_rate: float):
+    """A2A app that "translates" by commenting the code after ``latency`` seconds (+/- 50%)."""
+    from a2a.server.agent_execution import AgentExecutor
+    from a2a.server.apps import A2AStarletteApplication
+    from a2a.server.request_handlers import DefaultRequestHandler
+    from a2a.server.tasks import InMemoryTaskStore
+    from a2a.types import AgentCapabilities, AgentCard, AgentSkill
+    from a2a.utils import new_agent_text_message
+
+    class FakeTranslator(AgentExecutor):
+        async def execute(self, context, event_queue):
+            await asyncio.sleep(latency * random.uniform(0.5, 1.5))
+            if random.random() < failure_rate:
+                raise RuntimeError("Simulated purple agent failure")
+            request = json.loads(context.get_user_input())
+            translated = "// translated\n" + request["code_to_translate"]
+            await event_queue.enqueue_event(new_agent_text_message(json.dumps({"translated_code": translated})))
+
+        async def cancel(self, context, event_queue):
+            pass
+
+    card = AgentCard(
+        name="BenchmarkPurpleAgent",
+        description="Fake translator for benchmarks",
+        url=f"http://127.0.0.1:{port}/",
+        version="1.0.0",
+        default_input_modes=["text/plain"],
+        default_output_modes=["text/plain"],
+        capabilities=AgentCapabilities(streaming=True),
+        skills=[AgentSkill(id="translate", name="Translate", description="Fake translation", tags=["benchmark"])],
+    )
+    handler = DefaultRequestHandler(FakeTranslator(), InMemoryTaskStore())
+    return A2AStarletteApplication(agent_card=card, http_handler=handler).build()
+
+
+# --- FAKE GEMINI ---
+
+def fake_token_count(text: str) -> int:
+    return len(text) // 4
+
+
+class FakeCaches:
+    """Stands in for ``client.aio.caches``, holding the cached prompt prefixes in memory.
+
+    Like Gemini, it refuses contents below the model's minimum cache size.
+    """
+
+    def __init__(self):
+        self.contents: dict[str, str] = {}
+
+    async def create(self, model, config=None):
+        from src.prefix_cache import min_cache_tokens
+
+        if fake_token_count(config.system_instruction) < min_cache_tokens(model):
+            raise ValueError(f"Cached content is too small: the minimum for {model} is "
+                             f"{min_cache_tokens(model)} tokens")
+        name = f"cachedContents/{model}-{len(self.contents)}"
+        self.contents[name] = config.system_instruction
+        return types.SimpleNamespace(name=name)
+
+    async def update(self, name, config=None):
+        return types.SimpleNamespace(name=name)
+
+
+class FakeModels:
+    """Stands in for ``client.aio.models``; answers with a fixed verdict after ``latency`` seconds."""
+
+    def __init__(self, latency: float, failure_rate: float, caches: FakeCaches):
+        self._latency = latency
+        self._failure_rate = failure_rate
+        self._caches = caches
+
+    async def count_tokens(self, model, contents):
+        return types.SimpleNamespace(total_tokens=fake_token_count(contents))
+
+    async def generate_content(self, model, contents, config=None):
+        from src.common import TranslatorEval
+
+        await asyncio.sleep(self._latency * random.uniform(0.5, 1.5))
+        if random.random() < self._failure_rate:
+            raise RuntimeError("Simulated judge failure")
+        verdict = TranslatorEval(reasoning="Benchmark verdict", winner="translator", execution_correctness=8,
+                                 style_score=7, conciseness=8, relevance=9)
+        cached = self._caches.contents.get(getattr(config, "cached_content", None) or "", "")
+        usage = types.SimpleNamespace(cached_content_token_count=fake_token_count(cached) if cached else None)
+        return types.SimpleNamespace(parsed=verdict, text=verdict.model_dump_json(), usage_metadata=usage)
+
+
+# --- GREEN AGENT ---
+
+def build_green_app(port: int, judge_latency: float, judge_failure_rate: float, judge_name: str, state_dir: str):
+    from a2a.server.apps import A2AStarletteApplication
+    from a2a.server.request_handlers import DefaultRequestHandler
+
+    from src.agent import TranslationGreenAgent
+    from src.common import translator_judge_agent_card
+    from src.executor import GreenExecutor
+    from src.judge import GeminiJudge
+    from src.judge_cache import JudgeCache
+    from src.rate_limiter import RateLimiter
+    from src.task_store import SqliteTaskStore
+    from src.tool_provider import ToolProvider
+
+    task_store = SqliteTaskStore(os.path.join(state_dir, "tasks.sqlite3"))
+    agent = TranslationGreenAgent(ToolProvider(), judge="local", task_store=task_store)
+    if judge_name == "gemini":
+        caches = FakeCaches()
+        judge = GeminiJudge(client=types.SimpleNamespace(aio=types.SimpleNamespace(
+            models=FakeModels(judge_latency, judge_failure_rate, caches), caches=caches)))
+        judge._judge_cache = JudgeCache(os.path.join(state_dir, "judge_cache.sqlite3"))
+        # Measure the agent, not the Gemini quotas
+        judge._rate_limiter = RateLimiter(requests_per_minute=10**9, tokens_per_minute=10**12, model_limits={})
+        agent._judges["gemini"] = judge
+    card = translator_judge_agent_card(name="TranslatorGreenAgent", url=f"http://127.0.0.1:{port}/")
+    handler = DefaultRequestHandler(GreenExecutor(agent, task_store=task_store), task_store)
+    return A2AStarletteApplication(agent_card=card, http_handler=handler).build()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def serve(app, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.01)
+    return server, task
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def counter_total(counter, exclude_outcome: str | None = None) -> int:
+    """Sum of a counter of this (fresh) process over all label values."""
+    outcome = counter.label_names.index("outcome") if exclude_outcome else None
+    return int(sum(value for key, value in counter._values.items()
+                   if outcome is None or key[outcome] != exclude_outcome))
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# --- SUITE ---
+
+async def run_suite_async(settings: dict) -> dict:
+    import httpx
+    from a2a.client import A2ACardResolver, ClientConfig, ClientFactory
+    from a2a.types import DataPart, Message, Part, Role, TaskArtifactUpdateEvent, TaskStatusUpdateEvent, TextPart
+
+    from src import metrics
+    from src.logging_setup import configure_logging, stop_logging
+
+    # Simulated failures would otherwise flood the output with errors
+    configure_logging(level="CRITICAL")
+    logging.getLogger("a2a").setLevel(logging.CRITICAL)
+    random.seed(settings["seed"])
+    purple_port, green_port = free_port(), free_port()
+    with tempfile.TemporaryDirectory() as state_dir:
+        purple = await serve(build_purple_app(purple_port, settings["purple_latency"],
+                                              settings["purple_failure_rate"]), purple_port)
+        green = await serve(build_green_app(green_port, settings["judge_latency"], settings["judge_failure_rate"],
+                                            settings["judge"], state_dir), green_port)
+        try:
+            cases = [f"def case_{i}(x):\n    return x * {i} + {i % 7}\n" for i in range(settings["cases"])]
+            payload = {
+                "participants": {"translator": f"http://127.0.0.1:{purple_port}"},
+                "config": {
+                    "test_cases": cases,
+                    "source_language": "python",
+                    "target_language": "javascript",
+                    "judge": settings["judge"],
+                    "max_concurrency": settings["concurrency"],
+                    "use_judge_cache": False,
+                },
+            }
+            started_at: dict[int, float] = {}
+            latencies: list[float] = []
+            async with httpx.AsyncClient(timeout=None) as httpx_client:
+                card = await A2ACardResolver(httpx_client, f"http://127.0.0.1:{green_port}").get_agent_card()
+                client = ClientFactory(ClientConfig(httpx_client=httpx_client, streaming=True)).create(card)
+                message = Message(kind="message", role=Role.user, parts=[Part(TextPart(text=json.dumps(payload)))],
+                                  message_id=uuid4().hex)
+                started = time.perf_counter()
+                state = None
+                async for event in client.send_message(message):
+                    if not isinstance(event, tuple):
+                        continue
+                    task, update = event
+                    state = task.status.state.value
+                    now = time.perf_counter()
+                    if isinstance(update, TaskStatusUpdateEvent) and update.status.message:
+                        text = update.status.message.parts[0].root.text
+                        if match := PROCESSING_STATUS.match(text):
+                            started_at[int(match.group(1))] = now
+                    elif isinstance(update, TaskArtifactUpdateEvent) and update.artifact.name == "Case Results":
+                        for part in update.artifact.parts:
+                            if isinstance(part.root, DataPart):
+                                case = part.root.data["case"]
+                                latencies.append(now - started_at.get(case, started))
+                elapsed = time.perf_counter() - started
+        finally:
+            for server, task in (green, purple):
+                server.should_exit = True
+                await task
+            stop_logging()
+
+    return {
+        "cases": settings["cases"],
+        "concurrency": settings["concurrency"],
+        "state": state,
+        "completed_cases": len(latencies),
+        "translation_errors": counter_total(metrics.translation_errors_total),
+        "failed_judge_attempts": counter_total(metrics.judge_attempts_total, exclude_outcome="success"),
+        "judge_cached_tokens": counter_total(metrics.judge_cached_tokens_total),
+        "seconds": round(elapsed, 3),
+        "cases_per_second": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_p50": round(percentile(latencies, 50), 4),
+        "latency_p95": round(percentile(latencies, 95), 4),
+        "latency_p99": round(percentile(latencies, 99), 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def run_suite(settings: dict) -> dict:
+    return asyncio.run(run_suite_async(settings))
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: list[dict], baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = {(s["cases"], s["concurrency"]): s for s in json.load(f)["suites"]}
+    print(f"\n--- Compared with {baseline_path} ---")
+    for suite in results:
+        before = baseline.get((suite["cases"], suite["concurrency"]))
+        if not before or not before["cases_per_second"]:
+            continue
+        ratio = suite["cases_per_second"] / before["cases_per_second"]
+        print(f"{suite['cases']:>6} cases x{suite['concurrency']:<4} {before['cases_per_second']:>9.2f} -> "
+              f"{suite['cases_per_second']:>9.2f} cases/s ({ratio:.2f}x), p95 {before['latency_p95']:.3f}s -> "
+              f"{suite['latency_p95']:.3f}s, RSS {before['peak_rss_mb']} -> {suite['peak_rss_mb']} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the green agent against a fake purple agent and judge")
+    parser.add_argument("--cases", default="1,10,100,1000", help="Comma-separated suite sizes")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated max_concurrency values")
+    parser.add_argument("--judge", choices=["gemini", "local"], default="gemini",
+                        help="Judge backend; 'gemini' uses the fake genai client")
+    parser.add_argument("--purple-latency", type=float, default=0.05, help="Mean purple agent latency (s)")
+    parser.add_argument("--purple-failure-rate", type=float, default=0.0, help="Share of failed translations")
+    parser.add_argument("--judge-latency", type=float, default=0.05, help="Mean fake Gemini latency (s)")
+    parser.add_argument("--judge-failure-rate", type=float, default=0.0, help="Share of failed Gemini calls")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Results file (default: benchmark_results/<commit>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare with")
+    args = parser.parse_args()
+
+    commit = current_commit()
+    results = []
+    print(f"{'cases':>6} {'conc':>5} {'cases/s':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'RSS MB':>7}  state")
+    for cases in [int(n) for n in args.cases.split(",")]:
+        for concurrency in [int(n) for n in args.concurrency.split(",")]:
+            settings = {
+                "cases": cases,
+                "concurrency": concurrency,
+                "judge": args.judge,
+                "purple_latency": args.purple_latency,
+                "purple_failure_rate": args.purple_failure_rate,
+                "judge_latency": args.judge_latency,
+                "judge_failure_rate": args.judge_failure_rate,
+                "seed": args.seed,
+            }
+            # A fresh process per suite, so peak RSS belongs to that suite alone
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                suite = pool.submit(run_suite, settings).result()
+            results.append(suite)
+            print(f"{cases:>6} {concurrency:>5} {suite['cases_per_second']:>9.2f} {suite['latency_p50']:>8.3f} "
+                  f"{suite['latency_p95']:>8.3f} {suite['latency_p99']:>8.3f} {suite['peak_rss_mb']:>7}  "
+                  f"{suite['state']} ({suite['translation_errors']} translation errors, "
+                  f"{suite['failed_judge_attempts']} failed judge calls, "
+                  f"{suite['judge_cached_tokens']} cached prompt tokens)")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "commit": commit,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "settings": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+            "suites": results,
+        }, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
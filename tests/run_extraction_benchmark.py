@@ -0,0 +1,118 @@
+"""Benchmark of response extraction (src/extraction.py) on multi-megabyte responses.
+
+Compares ``extract_code`` / ``extract_json_object`` with the inline regular
+expressions they replaced, on generated participant and judge answers:
+
+    python tests/run_extraction_benchmark.py --size-mb 1,4,16
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.extraction import extract_code, extract_json_object  # noqa: E402
+
+CODE_LINE = "    if (values[i] > limit) {{ total += scale({i}, {{ factor: 2 }}); }}\n"
+
+
+def legacy_extract_code(response: str) -> str:
+    """The extraction run_eval did inline before src/extraction.py."""
+    translated_code = None
+    try:
+        data = json.loads(response)
+        if isinstance(data, dict):
+            translated_code = data.get("translated_code") or data.get("code") or data.get("content") or data.get("message")
+        elif isinstance(data, str):
+            translated_code = data
+    except json.JSONDecodeError:
+        pass
+    if not translated_code:
+        matches = re.findall(r"```(?:\w+)?\n(.*?)```", response, re.DOTALL)
+        if matches:
+            translated_code = max(matches, key=len).strip()
+    if not translated_code:
+        translated_code = response.strip()
+    return translated_code
+
+
+def legacy_extract_json_object(text: str) -> dict | None:
+    """The Gemma judge path's flat-object regular expression."""
+    match = re.search(r'\{[^{}]*\}', text, re.DOTALL)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(0))
+    except ValueError:
+        return None
+
+
+def generated_code(size: int) -> str:
+    lines = []
+    length = 0
+    i = 0
+    while length < size:
+        line = CODE_LINE.format(i=i)
+        lines.append(line)
+        length += len(line)
+        i += 1
+    return "function run(values, limit) {\n  let total = 0;\n" + "".join(lines) + "  return total;\n}\n"
+
+
+def responses(size: int) -> dict[str, str]:
+    code = generated_code(size)
+    return {
+        "json": json.dumps({"translated_code": code}),
+        "fenced": f"Here is the translation:\n\n```javascript\n{code}```\n\nIt keeps the same structure.",
+        "prose+json": f"Sure, here it is: {json.dumps({'translated_code': code, 'notes': {'loops': 1}})} Enjoy!",
+        "raw": code,
+    }
+
+
+def judge_answer(size: int) -> str:
+    reasoning = generated_code(size)
+    verdict = {"reasoning": reasoning, "scores": {"detail": [1, 2]}, "winner": "translator",
+               "execution_correctness": 8, "style_score": 7, "conciseness": 8, "relevance": 9}
+    return "Evaluation follows.\n```json\n" + json.dumps(verdict) + "\n```"
+
+
+def timed(function, *args, repeat: int) -> tuple[float, object]:
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark response extraction on large responses")
+    parser.add_argument("--size-mb", default="1,4,16", help="Comma-separated response sizes in MB")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'response':<12} {'legacy ms':>10} {'new ms':>10} {'new MB/s':>9}  same as legacy")
+    for size_mb in [float(n) for n in args.size_mb.split(",")]:
+        size = int(size_mb * 1024 * 1024)
+        for name, response in responses(size).items():
+            legacy_seconds, legacy = timed(legacy_extract_code, response, repeat=args.repeat)
+            new_seconds, new = timed(extract_code, response, None, "javascript", repeat=args.repeat)
+            throughput = len(response) / (1024 * 1024) / new_seconds
+            print(f"{size_mb:>5}M {name:<12} {legacy_seconds * 1000:>10.1f} {new_seconds * 1000:>10.1f} "
+                  f"{throughput:>9.0f}  {legacy.strip() == new.strip()}")
+
+        answer = judge_answer(size)
+        legacy_seconds, legacy = timed(legacy_extract_json_object, answer, repeat=args.repeat)
+        new_seconds, new = timed(extract_json_object, answer, repeat=args.repeat)
+        throughput = len(answer) / (1024 * 1024) / new_seconds
+        print(f"{size_mb:>5}M {'judge json':<12} {legacy_seconds * 1000:>10.1f} {new_seconds * 1000:>10.1f} "
+              f"{throughput:>9.0f}  legacy parsed: {legacy is not None}, new parsed: {new is not None}")
+
+
+if __name__ == "__main__":
+    main()
@@ -206,3 +206,51 @@ async def test_message(agent, streaming):
     assert not all_errors, f"Message validation failed:\n" + "\n".join(all_errors)
 
 # Add your custom tests here
+
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+
+async def jsonrpc(url: str, method: str, params: dict[str, Any]) -> dict[str, Any]:
+    async with httpx.AsyncClient(timeout=30) as httpx_client:
+        response = await httpx_client.post(url, json={"jsonrpc": "2.0", "id": uuid4().hex, "method": method, "params": params})
+    return response.json()
+
+
+@asynccontextmanager
+async def silent_participant():
+    """URL of a participant that accepts connections but never answers, so evaluations stay running."""
+    async def hold(reader, writer):
+        await reader.read()
+        writer.close()
+
+    server = await asyncio.start_server(hold, "127.0.0.1", 0)
+    try:
+        yield f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+    finally:
+        server.close()
+
+
+@pytest.mark.asyncio
+async def test_cancel_running_task(agent):
+    """tasks/cancel on a running assessment answers with the canceled task."""
+    async with silent_participant() as participant:
+        payload = json.dumps({
+            "participants": {"translator": participant},
+            "config": {"code_to_translate": "print('hello')", "source_language": "python",
+                       "target_language": "javascript", "judge": "local"},
+        })
+        message = {"kind": "message", "role": "user", "messageId": uuid4().hex,
+                   "parts": [{"kind": "text", "text": payload}]}
+        sent = await jsonrpc(agent, "message/send", {"message": message, "configuration": {"blocking": False}})
+        task = sent["result"]
+        assert task["status"]["state"] in ("submitted", "working")
+
+        await asyncio.sleep(1)
+        canceled = await jsonrpc(agent, "tasks/cancel", {"id": task["id"]})
+        assert "error" not in canceled, canceled
+        assert canceled["result"]["status"]["state"] == "canceled"
+
+        fetched = await jsonrpc(agent, "tasks/get", {"id": task["id"]})
+        assert fetched["result"]["status"]["state"] == "canceled"
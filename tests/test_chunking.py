@@ -0,0 +1,117 @@
+import pytest
+
+from src.chunking import merge_evaluations, split_source
+from src.common import TranslatorEval
+
+PYTHON = '''import os
+
+
+@cache
+def first():
+    return 1
+
+
+class Second:
+    def method(self):
+        return "{"
+
+
+print(first())
+'''
+
+JAVASCRIPT = '''// Helpers
+function first() {
+    return "}";
+}
+
+/* { not a block */
+const second = () => {
+    return `
+}`;
+};
+'''
+
+RUST = '''fn longest<'a>(x: &'a str, y: &'a str) -> &'a str {
+    if x.len() > y.len() { x } else { y }
+}
+
+struct Holder<'a> {
+    part: &'a str,
+}
+'''
+
+ALLMAN = '''int first(void)
+{
+    return 1;
+}
+int second(void)
+{
+    return 2;
+}
+'''
+
+
+@pytest.mark.parametrize("code, language", [
+    (PYTHON, "python"), (JAVASCRIPT, "javascript"), (RUST, "rust"), (ALLMAN, "c"),
+    ("one\r\ntwo\r\n\r\nthree", "text"), ("x = (\n", "python"),
+])
+@pytest.mark.parametrize("max_chars", [1, 20, 60, 10_000])
+def test_chunks_join_to_source(code, language, max_chars):
+    chunks = split_source(code, language, max_chars)
+    assert "".join(chunks) == code
+    assert all(chunks)
+
+
+def test_python_units():
+    assert split_source(PYTHON, "python", 1) == [
+        "import os\n\n\n",
+        "@cache\ndef first():\n    return 1\n\n\n",
+        "class Second:\n    def method(self):\n        return \"{\"\n\n\n",
+        "print(first())\n",
+    ]
+
+
+def test_brace_units_ignore_strings_and_comments():
+    assert split_source(JAVASCRIPT, "javascript", 1) == [
+        "// Helpers\n",
+        "function first() {\n    return \"}\";\n}\n",
+        "\n",
+        "/* { not a block */\n",
+        "const second = () => {\n    return `\n}`;\n};\n",
+    ]
+
+
+def test_rust_lifetimes_are_not_quotes():
+    chunks = split_source(RUST, "rust", 1)
+    assert chunks[0].startswith("fn longest") and chunks[0].endswith("}\n")
+    assert chunks[-1].startswith("struct Holder")
+
+
+def test_allman_bodies_stay_with_their_declaration():
+    assert split_source(ALLMAN, "c", 1) == [
+        "int first(void)\n{\n    return 1;\n}\n",
+        "int second(void)\n{\n    return 2;\n}\n",
+    ]
+
+
+def test_small_units_are_packed():
+    assert split_source(ALLMAN, "c", 1000) == [ALLMAN]
+    assert len(split_source(PYTHON, "python", 60)) < len(split_source(PYTHON, "python", 1))
+
+
+def test_deep_python_falls_back_to_paragraphs():
+    code = "x = " + "+".join(["1"] * 100000) + "\n\ny = 2\n"
+    assert split_source(code, "python", 100) == [code[:-6], "y = 2\n"]
+
+
+def test_merge_evaluations_weights_by_size():
+    def verdict(score: float, winner: str) -> TranslatorEval:
+        return TranslatorEval(reasoning="part", execution_correctness=score, style_score=score,
+                              conciseness=score, relevance=score, winner=winner)
+
+    merged = merge_evaluations([verdict(10, "alice"), verdict(4, "bob"), verdict(4, "bob")], [300, 50, 50])
+    assert merged.execution_correctness == 8.5
+    assert merged.relevance == 8.5
+    # alice's part covers 300 of the 400 characters
+    assert merged.winner == "alice"
+    assert "[part 2/3, 50 chars] Winner: bob." in merged.reasoning
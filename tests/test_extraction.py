@@ -0,0 +1,33 @@
+from src.extraction import extract_code, fenced_blocks
+
+
+def test_fenced_block_tagged_with_language():
+    response = "Sure:\n```python\nprint(1)\n```\nand\n```javascript\nconsole.log(1);\n```\n"
+    assert extract_code(response, language="javascript") == "console.log(1);"
+
+
+def test_inline_backticks_are_not_fences():
+    response = "Use ```x = 1``` style.\nHere is the code:\n```javascript\nconsole.log(1);\n```\n"
+    assert extract_code(response) == "console.log(1);"
+
+
+def test_indented_fences():
+    assert fenced_blocks("  ```go\n  x := 1\n  ```\n") == [("go", "  x := 1\n  ")]
+
+
+def test_json_answers():
+    assert extract_code('{"translated_code": "let x = 1;"}') == "let x = 1;"
+    assert extract_code('Here it is: {"translated_code": "let x = 1;"} Enjoy.') == "let x = 1;"
+    assert extract_code("", data=[{"code": "let x = 1;"}]) == "let x = 1;"
+
+
+def test_raw_code_and_empty_answer():
+    assert extract_code("  const f = () => { return 1; };\n") == "const f = () => { return 1; };"
+    assert extract_code("   ") is None
+
+
+def test_deeply_nested_json_falls_back_to_raw_text():
+    nested = '{"a":[' * 1000
+    assert extract_code(nested) == nested
+    assert extract_code("here: " + nested) == "here: " + nested
+    assert extract_code("```json\n" + "[" * 100000 + "\n```\n") == "[" * 100000
@@ -0,0 +1,48 @@
+import pytest
+
+from src.common import TRANSLATION_ERROR_PREFIX
+from src.local_judge import LocalJudge, check_syntax
+
+ORIGINAL = "function add(first, second) {\n    return first + second;\n}\n"
+TRANSLATION = "# Python translation of the javascript add\ndef add(first, second):\n    return first + second\n"
+
+
+@pytest.mark.asyncio
+async def test_python_syntax_check():
+    assert await check_syntax("x = 1\n", "python") is True
+    assert await check_syntax("x = (\n", "python") is False
+    # Valid, but too deep for the parser: unknown rather than an error
+    assert await check_syntax("x = " + "+".join(["1"] * 100000), "python") is None
+
+
+@pytest.mark.asyncio
+async def test_no_checker_for_language():
+    assert await check_syntax("anything", "cobol") is None
+
+
+@pytest.mark.asyncio
+async def test_judge_case_scores_translation():
+    evaluation = await LocalJudge().judge_case("Case 1/1", "translator", ORIGINAL, TRANSLATION, "js", "python")
+    assert evaluation.winner == "translator"
+    assert evaluation.execution_correctness >= 6
+    assert "identifier recall 1.00" in evaluation.reasoning
+
+    broken = await LocalJudge().judge_case("Case 1/1", "translator", ORIGINAL, "def add(first, second:\n",
+                                           "js", "python")
+    assert broken.winner == "N/A"
+    assert broken.execution_correctness == 1
+
+
+@pytest.mark.asyncio
+async def test_judge_case_deep_translation_does_not_raise():
+    deep = "x = " + "+".join(["1"] * 100000)
+    evaluation = await LocalJudge().judge_case("Case 1/1", "translator", ORIGINAL, deep, "js", "python")
+    assert "could not be run" in evaluation.reasoning
+
+
+@pytest.mark.asyncio
+async def test_judge_case_without_translation():
+    evaluation = await LocalJudge().judge_case("Case 1/1", "translator", ORIGINAL,
+                                               f"{TRANSLATION_ERROR_PREFIX} No Code Translated", "js", "python")
+    assert evaluation.winner == "N/A"
+    assert evaluation.execution_correctness == 0
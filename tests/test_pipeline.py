@@ -0,0 +1,216 @@
+import json
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from src import agent as agent_module
+from src import judge as judge_module
+from src.agent import TranslationGreenAgent, case_winner
+from src.common import CaseEvaluation, ComparativeEvaluation, EvalRequest, ParticipantEvaluation, TranslatorEval
+from src.judge import JSON_SUPPORTED_MODELS, TEXT_ONLY_MODELS, GeminiJudge
+from src.model_router import ModelRouter
+from src.prefix_cache import PromptPrefixCache
+from src.rate_limiter import RateLimiter
+from src.task_store import SqliteTaskStore
+from src.translation_store import TranslationStore
+
+
+class FakeParticipant:
+    """Stands in for the ToolProvider; every participant echoes the code it was sent as JavaScript.
+
+    Its task fails instead for the code in ``failing``.
+    """
+
+    def __init__(self, failing: set[str] = frozenset()):
+        self.sent: list[str] = []
+        self.failing = failing
+
+    async def get_agent_card(self, url: str):
+        return SimpleNamespace(name="echo", version="1.0")
+
+    async def send_to_agent(self, message: dict, url: str, new_conversation: bool = False) -> dict:
+        self.sent.append(message["code_to_translate"])
+        if message["code_to_translate"] in self.failing:
+            return {"response": "ERROR: Task failed: overloaded", "data": [], "status": "failed"}
+        return {"response": json.dumps({"translated_code": f"// {message['code_to_translate']}"}), "data": [],
+                "status": "completed"}
+
+
+class FakeModels:
+    """Stands in for ``client.aio.models``, recording the schema of every judge request."""
+
+    def __init__(self):
+        self.schemas = []
+
+    async def count_tokens(self, model, contents):
+        return SimpleNamespace(total_tokens=len(contents) // 4)
+
+    async def generate_content(self, model, contents, config=None):
+        self.schemas.append(config.response_schema)
+        scores = {"execution_correctness": 8, "style_score": 7, "conciseness": 8, "relevance": 9,
+                  "winner": "translator"}
+        if config.response_schema == ComparativeEvaluation:
+            # The last participant listed always wins the comparison
+            roles = re.findall(r"^### Participant '(.+)'$", contents, re.MULTILINE)
+            scores["winner"] = roles[-1]
+            parsed = ComparativeEvaluation(winner=roles[-1], evaluations=[
+                ParticipantEvaluation(participant=role, reasoning="Compared", **scores) for role in roles
+            ])
+        elif config.response_schema == list[CaseEvaluation]:
+            parsed = [CaseEvaluation(case_id=int(case_id), reasoning=f"Batch verdict {case_id}", **scores)
+                      for case_id in re.findall(r"^### Case (\d+)$", contents, re.MULTILINE)]
+        else:
+            parsed = TranslatorEval(reasoning="Single verdict", **scores)
+        return SimpleNamespace(parsed=parsed, usage_metadata=None)
+
+
+class FakeUpdater:
+    """Records the status updates and artifacts of one task."""
+
+    def __init__(self, task_id: str):
+        self.task_id = task_id
+        self.statuses: list[tuple[str, str]] = []
+        self.artifacts: dict[str, list] = {}
+
+    async def update_status(self, state, message=None, **kwargs):
+        self.statuses.append((state, message.parts[0].root.text if message else ""))
+
+    async def add_artifact(self, parts, name=None, **kwargs):
+        self.artifacts.setdefault(name, []).extend(part.root.data for part in parts)
+
+    async def failed(self, message=None):
+        self.statuses.append(("failed", message.parts[0].root.text))
+
+
+@pytest.fixture
+def models(monkeypatch):
+    models = FakeModels()
+    client = SimpleNamespace(aio=SimpleNamespace(models=models))
+    # Fresh, unthrottled process-wide state, so no test waits on the Gemini quotas used by another
+    monkeypatch.setattr(judge_module, "model_router", ModelRouter(JSON_SUPPORTED_MODELS + TEXT_ONLY_MODELS))
+    monkeypatch.setattr(judge_module, "rate_limiter", RateLimiter(10**6, 10**9, model_limits={}))
+    monkeypatch.setattr(judge_module, "prefix_cache", PromptPrefixCache())
+    monkeypatch.setitem(agent_module.JUDGE_BACKENDS, "gemini", lambda: GeminiJudge(client=client))
+    return models
+
+
+def evaluation_request(test_cases: list[str], roles: tuple[str, ...] = ("translator",), **config) -> EvalRequest:
+    return EvalRequest(
+        participants={role: f"http://{role}.invalid" for role in roles},
+        config={"test_cases": test_cases, "source_language": "python", "target_language": "javascript",
+                "judge": "gemini", "use_judge_cache": False, **config},
+    )
+
+
+@pytest.mark.asyncio
+async def test_previous_task_id_reuses_unchanged_cases(models, tmp_path):
+    """Only the cases that changed since the previous run are translated and judged again."""
+    participant = FakeParticipant()
+    task_store = SqliteTaskStore(str(tmp_path / "tasks.sqlite3"))
+    green_agent = TranslationGreenAgent(participant, judge="gemini", task_store=task_store)
+
+    await green_agent.run_eval(evaluation_request(["a = 1", "b = 2", "c = 3"]), FakeUpdater("first"))
+    assert sorted(participant.sent) == ["a = 1", "b = 2", "c = 3"]
+
+    updater = FakeUpdater("second")
+    request = evaluation_request(["a = 1", "b = 20", "c = 3"], previous_task_id="first")
+    await green_agent.run_eval(request, updater)
+    task_store.close()
+
+    assert sorted(participant.sent) == ["a = 1", "b = 2", "b = 20", "c = 3"]
+    assert len(models.schemas) == 4
+    assert any("Reused 2/3 cases from task first" in text for _, text in updater.statuses)
+    assert updater.statuses[-1][0] == "completed"
+    assert sorted(case["case"] for case in updater.artifacts["Case Results"]) == [1, 2, 3]
+
+
+
+@pytest.mark.asyncio
+async def test_previous_task_id_redoes_failed_participant_tasks(models, tmp_path):
+    """A case whose participant task failed is checkpointed as failed and translated again."""
+    participant = FakeParticipant(failing={"b = 2"})
+    task_store = SqliteTaskStore(str(tmp_path / "tasks.sqlite3"))
+    green_agent = TranslationGreenAgent(participant, judge="gemini", task_store=task_store)
+
+    await green_agent.run_eval(evaluation_request(["a = 1", "b = 2"]), FakeUpdater("first"))
+    assert {i: failed for i, (_, _, failed) in (await task_store.load_checkpoints("first")).items()} == \
+        {0: False, 1: True}
+
+    participant.failing = set()
+    await green_agent.run_eval(evaluation_request(["a = 1", "b = 2"], previous_task_id="first"), FakeUpdater("second"))
+    task_store.close()
+    assert sorted(participant.sent) == ["a = 1", "b = 2", "b = 2"]
+
+
+
+@pytest.mark.asyncio
+async def test_rejudge_replays_only_completed_translations(models, tmp_path):
+    """A failed participant task is not stored, so 'rejudge' asks the participant again for that case."""
+    participant = FakeParticipant(failing={"b = 2"})
+    translation_store = TranslationStore(str(tmp_path / "translations.sqlite3"))
+    green_agent = TranslationGreenAgent(participant, judge="gemini", translation_store=translation_store)
+
+    await green_agent.run_eval(evaluation_request(["a = 1", "b = 2"]), FakeUpdater("first"))
+    assert await translation_store.get("echo", "1.0", "python", "javascript", "a = 1") == "// a = 1"
+    assert await translation_store.get("echo", "1.0", "python", "javascript", "b = 2") is None
+
+    participant.failing = set()
+    await green_agent.run_eval(evaluation_request(["a = 1", "b = 2"], rejudge=True), FakeUpdater("second"))
+    translation_store.close()
+    assert sorted(participant.sent) == ["a = 1", "b = 2", "b = 2"]
+
+
+@pytest.mark.asyncio
+async def test_judge_batch_scores_cases_in_one_request(models):
+    """With 'judge_batch_size', a participant's translated cases are scored by a single judge request."""
+    green_agent = TranslationGreenAgent(FakeParticipant(), judge="gemini")
+    updater = FakeUpdater("batch")
+    request = evaluation_request(["a = 1", "b = 2", "c = 3"], judge_batch_size=3, judge_workers=1)
+    await green_agent.run_eval(request, updater)
+
+    assert models.schemas == [list[CaseEvaluation]]
+    verdicts = {case["case"]: case["reasoning"] for case in updater.artifacts["Case Results"]}
+    assert verdicts == {1: "Batch verdict 1", 2: "Batch verdict 2", 3: "Batch verdict 3"}
+    assert updater.statuses[-1][0] == "completed"
+
+
+def verdict(role: str, score: float) -> TranslatorEval:
+    return TranslatorEval(reasoning="", execution_correctness=score, style_score=score, conciseness=score,
+                          relevance=score, winner=role)
+
+
+def test_case_winner():
+    # The best scored acceptable translation wins; an exact tie has no winner
+    assert case_winner({"alice": verdict("alice", 7), "bob": verdict("bob", 8)}) == "bob"
+    assert case_winner({"alice": verdict("alice", 8), "bob": verdict("N/A", 9)}) == "alice"
+    assert case_winner({"alice": verdict("alice", 8), "bob": verdict("bob", 8)}) == "N/A"
+    assert case_winner({"alice": verdict("N/A", 8), "bob": verdict("N/A", 8)}) == "N/A"
+    # A comparative verdict names the same winner in every evaluation
+    assert case_winner({"alice": verdict("bob", 9), "bob": verdict("bob", 2)}) == "bob"
+
+
+@pytest.mark.asyncio
+async def test_tied_participants_have_no_winner(models):
+    """Identical verdicts for every participant are a tie, whatever the hash seed."""
+    green_agent = TranslationGreenAgent(FakeParticipant(), judge="gemini")
+    updater = FakeUpdater("tie")
+    await green_agent.run_eval(evaluation_request(["a = 1", "b = 2"], roles=("alice", "bob")), updater)
+
+    assert {case["winner"] for case in updater.artifacts["Case Results"]} == {"N/A"}
+    assert [result["winner"] for result in updater.artifacts["Evaluation Result"]] == ["N/A", "N/A"]
+
+
+@pytest.mark.asyncio
+async def test_comparative_judging_winner(models):
+    """With 'comparative_judging' the judge's pick wins every case and the evaluation."""
+    green_agent = TranslationGreenAgent(FakeParticipant(), judge="gemini")
+    updater = FakeUpdater("comparative")
+    request = evaluation_request(["a = 1", "b = 2", "c = 3"], roles=("alice", "bob"), comparative_judging=True)
+    await green_agent.run_eval(request, updater)
+
+    assert models.schemas == [ComparativeEvaluation] * 3
+    assert {case["winner"] for case in updater.artifacts["Case Results"]} == {"bob"}
+    assert [result["winner"] for result in updater.artifacts["Evaluation Result"]] == ["bob", "bob"]
+    assert updater.statuses[-1][0] == "completed"
+    assert "Winner: bob." in updater.statuses[-1][1]
@@ -0,0 +1,111 @@
+import time
+
+import pytest
+
+from src import rate_limiter
+from src.rate_limiter import RateLimiter, SharedRateLimiter, TokenBucket, retry_delay
+
+
+class QuotaError(Exception):
+    """Shaped like the Gemini SDK's API errors: the JSON error body is in ``details``."""
+
+    def __init__(self, message: str, details: dict | None = None):
+        super().__init__(message)
+        self.details = details
+
+
+def retry_info(delay: str) -> dict:
+    return {"error": {"code": 429, "details": [
+        {"@type": "type.googleapis.com/google.rpc.QuotaFailure", "violations": []},
+        {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": delay},
+    ]}}
+
+
+def test_retry_delay():
+    assert retry_delay(QuotaError("429 RESOURCE_EXHAUSTED", retry_info("7s"))) == 7.0
+    assert retry_delay(QuotaError("429 RESOURCE_EXHAUSTED", retry_info("12.5s"))) == 12.5
+    # RetryInfo takes precedence over the message
+    assert retry_delay(QuotaError("Please retry in 3s.", retry_info("7s"))) == 7.0
+    assert retry_delay(QuotaError("Quota exceeded. Please Retry in 41.37s.")) == 41.37
+    assert retry_delay(QuotaError("429 RESOURCE_EXHAUSTED", {"error": {"details": None}})) is None
+    assert retry_delay(QuotaError("429 RESOURCE_EXHAUSTED", retry_info("soon"))) is None
+    assert retry_delay(RuntimeError("boom")) is None
+
+
+def test_token_bucket():
+    bucket = TokenBucket(60)
+    now = bucket.updated
+    assert bucket.wait_time(60, now) == 0
+    bucket.consume(60, now)
+    # Refilled at one unit per second
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 0.5) == pytest.approx(0.5)
+    assert bucket.wait_time(10, now + 4) == pytest.approx(6.0)
+    # Never above capacity, and a request larger than it only waits for a full bucket
+    assert bucket.wait_time(1, now + 1000) == 0
+    assert bucket.level == 60
+    assert bucket.wait_time(500, now + 1000) == 0
+    bucket.consume(500, now + 1000)
+    assert bucket.level == 0
+
+
+@pytest.mark.asyncio
+async def test_acquire_waits_for_the_request_budget():
+    limiter = RateLimiter(model_limits={"model": (600, 10**6)})
+    started = time.monotonic()
+    for _ in range(600):
+        await limiter.acquire("model", 100)
+    assert time.monotonic() - started < 0.1
+    # The next request waits for the bucket to refill at 10 per second
+    await limiter.acquire("model", 100)
+    assert time.monotonic() - started >= 0.09
+    # Other models have budgets of their own
+    started = time.monotonic()
+    await limiter.acquire("other", 100)
+    assert time.monotonic() - started < 0.05
+
+
+@pytest.mark.asyncio
+async def test_acquire_waits_for_the_token_budget():
+    limiter = RateLimiter(model_limits={"model": (10**6, 6000)})
+    await limiter.acquire("model", 6000)
+    started = time.monotonic()
+    # 10 tokens refill in 0.1s
+    await limiter.acquire("model", 10)
+    assert 0.09 <= time.monotonic() - started < 0.5
+
+
+@pytest.mark.asyncio
+async def test_throttle_uses_the_retry_delay():
+    limiter = RateLimiter(model_limits={})
+    assert await limiter.throttle("model", 0.2) == 0.2
+    started = time.monotonic()
+    await limiter.acquire("model", 1)
+    assert time.monotonic() - started >= 0.19
+
+
+@pytest.mark.asyncio
+async def test_throttle_backoff_doubles_until_success(monkeypatch):
+    # The jitter picks the upper bound
+    monkeypatch.setattr(rate_limiter.random, "uniform", lambda low, high: high)
+    limiter = RateLimiter(model_limits={})
+    assert [await limiter.throttle("model") for _ in range(8)] == [2, 4, 8, 16, 32, 64, 120, 120]
+    await limiter.record_success("model")
+    assert await limiter.throttle("model") == 2
+    monkeypatch.setattr(rate_limiter.random, "uniform", lambda low, high: low)
+    assert await limiter.throttle("model") == 2
+
+
+@pytest.mark.asyncio
+async def test_shared_limiter_blocks_every_process(tmp_path, monkeypatch):
+    monkeypatch.setattr(rate_limiter.random, "uniform", lambda low, high: high)
+    path = str(tmp_path / "rate_limits.sqlite3")
+    first, second = SharedRateLimiter(path, model_limits={}), SharedRateLimiter(path, model_limits={})
+    assert await first.throttle("model", 0.2) == 0.2
+    started = time.monotonic()
+    await second.acquire("model", 1)
+    assert time.monotonic() - started >= 0.15
+    # The failure count is shared too, and reset by a success anywhere
+    assert await second.throttle("model") == 4
+    await first.record_success("model")
+    assert await second.throttle("model") == 2
@@ -0,0 +1,61 @@
+import pytest
+
+from src import sandbox
+from src.agent import TranslationGreenAgent
+from src.common import EvalRequest
+from src.sandbox import ExecutionPool
+
+ECHO = "print(input().upper())\n"
+
+
+def execution_request(**config) -> EvalRequest:
+    return EvalRequest(
+        participants={"translator": "http://translator.invalid"},
+        config={"code_to_translate": ECHO, "source_language": "python", "target_language": "python", **config},
+    )
+
+
+def test_execute_needs_allow_execution():
+    valid, message = TranslationGreenAgent(None, judge="local").validate_request(execution_request(execute=True))
+    assert not valid
+    assert "--allow-execution" in message
+
+    allowed = TranslationGreenAgent(None, judge="local", allow_execution=True)
+    assert allowed.validate_request(execution_request(execute=True)) == (True, "")
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    # No namespaces: the Python runner is run directly, under the rlimits and a short timeout
+    monkeypatch.setattr(sandbox, "EXECUTION_SANDBOX", "none")
+    monkeypatch.setattr(sandbox, "EXECUTION_TIMEOUT", 2.0)
+    return ExecutionPool(workers=2)
+
+
+@pytest.mark.asyncio
+async def test_compare_matching_outputs(pool):
+    translation = "import sys\nsys.stdout.write(input().upper() + '\\n')\n"
+    result = await pool.compare(ECHO, "python", translation, "py", ["abc", "xyz"])
+    assert result.score == 10
+    assert result.details == "2/2 inputs produced the original output"
+
+
+@pytest.mark.asyncio
+async def test_compare_differing_outputs(pool):
+    result = await pool.compare(ECHO, "python", "print(input())\n", "python", ["abc", "XYZ"])
+    assert result.score == 5
+    assert "input 1: outputs differ" in result.details
+
+
+@pytest.mark.asyncio
+async def test_compare_timeout(pool):
+    result = await pool.compare(ECHO, "python", "while True:\n    pass\n", "python", ["abc"])
+    assert result.score == 0
+    assert "input 1: translation timed out after 2s" in result.details
+
+
+@pytest.mark.asyncio
+async def test_compare_without_a_working_original(pool):
+    result = await pool.compare("raise SystemExit(3)\n", "python", ECHO, "python", ["abc"])
+    assert result.score is None
+    assert result.details.startswith("input 1: original ")
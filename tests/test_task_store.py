@@ -0,0 +1,32 @@
+import pytest
+from a2a.types import Task, TaskState, TaskStatus
+
+from src.common import TranslatorEval
+from src.task_store import SqliteTaskStore
+
+
+def task(task_id: str, state: TaskState) -> Task:
+    return Task(id=task_id, context_id="context", status=TaskStatus(state=state))
+
+
+@pytest.mark.asyncio
+async def test_fail_interrupted_tasks(tmp_path):
+    """Tasks left running by the last server run fail with a message naming 'resume_task_id'."""
+    task_store = SqliteTaskStore(str(tmp_path / "tasks.sqlite3"))
+    await task_store.save(task("running", TaskState.working))
+    await task_store.save(task("queued", TaskState.submitted))
+    await task_store.save(task("done", TaskState.completed))
+    evaluation = TranslatorEval(reasoning="", execution_correctness=8, style_score=8, conciseness=8, relevance=8,
+                                winner="translator")
+    await task_store.save_checkpoint("running", 0, "fingerprint", {"translator": evaluation})
+
+    task_store.fail_interrupted()
+
+    for task_id in ("running", "queued"):
+        interrupted = await task_store.get(task_id)
+        assert interrupted.status.state == TaskState.failed
+        assert f"'resume_task_id': '{task_id}'" in interrupted.status.message.parts[0].root.text
+    assert (await task_store.get("done")).status.state == TaskState.completed
+    # The checkpoints stay, so the task can be resumed
+    assert list(await task_store.load_checkpoints("running")) == [0]
+    task_store.close()